@@ -2,17 +2,39 @@
 
 import os
 import sys
+from collections import namedtuple
+from dataclasses import dataclass, fields, replace
 from socket import gethostname
+from typing import Optional
 import yaml
 
+try:
+    from yaml import CSafeLoader as SafeLoader  # libyaml-backed parser
+except ImportError:
+    from yaml import SafeLoader
+
 
 CONFIG_FILE = "/etc/lxc_autoscale/lxc_autoscale.yaml"
 
-if os.path.exists(CONFIG_FILE):
+
+def _config_stamp():
+    """Return the (mtime, size) of CONFIG_FILE, used to tell whether it was edited."""
+    stat = os.stat(CONFIG_FILE)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _read_config_file():
+    """Parse CONFIG_FILE and return its contents as a dictionary."""
     with open(CONFIG_FILE, 'r', encoding='utf-8') as file:
-        config = yaml.safe_load(file)
-else:
+        return yaml.load(file, Loader=SafeLoader) or {}
+
+
+try:
+    # Stamp before parsing, so an edit racing the read is picked up by the next reload
+    _loaded_stamp = _config_stamp()
+except FileNotFoundError:
     sys.exit(f"Configuration file {CONFIG_FILE} does not exist. Exiting...")
+config = _read_config_file()
 
 DEFAULTS = config.get('DEFAULT', {})
 
@@ -36,41 +58,200 @@ def get_config_value(section: str, key: str, default=None):
     return os.getenv(env_key, config.get(section, {}).get(key, default))
 
 
+def _as_bool(value) -> bool:
+    """Interpret YAML booleans and their environment variable spellings."""
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    return bool(value)
+
+
+@dataclass
+class Settings:
+    """Typed view of the DEFAULT section used on the hot paths, refreshed in place by reload_config()."""
+    poll_interval: int
+    energy_mode: bool
+    reserve_cpu_percent: int
+    reserve_memory_mb: int
+    off_peak_start: int
+    off_peak_end: int
+    behaviour: str
+    use_remote_proxmox: bool
+    proxmox_host: Optional[str]
+    ssh_port: int
+    ssh_user: Optional[str]
+    ssh_password: Optional[str]
+    ssh_key_path: Optional[str]
+
+
+def _load_settings() -> Settings:
+    """Build a Settings instance from the current configuration and environment."""
+    return Settings(
+        poll_interval=int(get_config_value('DEFAULT', 'poll_interval', 300)),
+        energy_mode=_as_bool(get_config_value('DEFAULT', 'energy_mode', False)),
+        reserve_cpu_percent=int(get_config_value('DEFAULT', 'reserve_cpu_percent', 10)),
+        reserve_memory_mb=int(get_config_value('DEFAULT', 'reserve_memory_mb', 2048)),
+        off_peak_start=int(get_config_value('DEFAULT', 'off_peak_start', 22)),
+        off_peak_end=int(get_config_value('DEFAULT', 'off_peak_end', 6)),
+        behaviour=str(get_config_value('DEFAULT', 'behaviour', 'normal')).lower(),
+        use_remote_proxmox=_as_bool(get_config_value('DEFAULT', 'use_remote_proxmox', False)),
+        proxmox_host=get_config_value('DEFAULT', 'proxmox_host'),
+        ssh_port=int(get_config_value('DEFAULT', 'ssh_port', 22)),
+        ssh_user=get_config_value('DEFAULT', 'ssh_user'),
+        ssh_password=get_config_value('DEFAULT', 'ssh_password'),
+        ssh_key_path=get_config_value('DEFAULT', 'ssh_key_path'),
+    )
+
+
+SETTINGS = _load_settings()
+
 # Configuration constants
 LOG_FILE = get_config_value('DEFAULT', 'log_file', '/var/log/lxc_autoscale.log')
 LOCK_FILE = get_config_value('DEFAULT', 'lock_file', '/var/lock/lxc_autoscale.lock')
 BACKUP_DIR = get_config_value(
     'DEFAULT', 'backup_dir', '/var/lib/lxc_autoscale/backups'
 )
-RESERVE_CPU_PERCENT = int(get_config_value('DEFAULT', 'reserve_cpu_percent', 10))
-RESERVE_MEMORY_MB = int(get_config_value('DEFAULT', 'reserve_memory_mb', 2048))
-OFF_PEAK_START = int(get_config_value('DEFAULT', 'off_peak_start', 22))
-OFF_PEAK_END = int(get_config_value('DEFAULT', 'off_peak_end', 6))
+RESERVE_CPU_PERCENT = SETTINGS.reserve_cpu_percent
+RESERVE_MEMORY_MB = SETTINGS.reserve_memory_mb
+OFF_PEAK_START = SETTINGS.off_peak_start
+OFF_PEAK_END = SETTINGS.off_peak_end
 IGNORE_LXC = set(map(str, get_config_value('DEFAULT', 'ignore_lxc', [])))
-BEHAVIOUR = get_config_value('DEFAULT', 'behaviour', 'normal').lower()
+BEHAVIOUR = SETTINGS.behaviour
 PROXMOX_HOSTNAME = gethostname()
 
+# Scaling parameters of a tier, resolved once so the adjustment loop reads attributes
+TierConfig = namedtuple('TierConfig', [
+    'cpu_upper_threshold', 'cpu_lower_threshold',
+    'cpu_upper_recovery', 'cpu_lower_recovery',
+    'memory_upper_threshold', 'memory_lower_threshold',
+    'core_min_increment', 'core_max_increment',
+    'memory_min_increment', 'min_decrease_chunk',
+    'min_cores', 'max_cores', 'min_memory',
+])
+
+# Values used when neither the tier nor the DEFAULT section sets a parameter
+TIER_FALLBACKS = {
+    'cpu_upper_threshold': 85, 'cpu_lower_threshold': 10,
+    # Hysteresis is off unless configured: recovery defaults to the thresholds
+    'cpu_upper_recovery': None, 'cpu_lower_recovery': None,
+    'memory_upper_threshold': 80, 'memory_lower_threshold': 10,
+    'core_min_increment': 1, 'core_max_increment': 4,
+    'memory_min_increment': 512, 'min_decrease_chunk': 512,
+    'min_cores': 1, 'max_cores': 16, 'min_memory': 512,
+}
+
+
+def _build_tier_config(section: dict) -> TierConfig:
+    """Resolve a tier section into a TierConfig, inheriting unset values from DEFAULT."""
+    tier = TierConfig._make(
+        section.get(name, DEFAULTS.get(name, fallback)) for name, fallback in TIER_FALLBACKS.items()
+    )
+    return tier._replace(
+        cpu_upper_recovery=tier.cpu_upper_threshold if tier.cpu_upper_recovery is None else tier.cpu_upper_recovery,
+        cpu_lower_recovery=tier.cpu_lower_threshold if tier.cpu_lower_recovery is None else tier.cpu_lower_recovery,
+    )
+
+
+def _load_tier_associations(target: dict):
+    """Fill `target` with the LXC tier configurations, keyed by container ID."""
+    global DEFAULT_TIER  # pylint: disable=global-statement
+    DEFAULT_TIER = _build_tier_config(DEFAULTS)
+    target.clear()
+    for section, tier_config in config.items():
+        if section.startswith('TIER_'):
+            tier = _build_tier_config(tier_config)
+            nodes = tier_config.get('lxc_containers') or []
+            for ctid in nodes:
+                target[str(ctid)] = tier
+
+
+def get_tier_config(ctid) -> TierConfig:
+    """Return the tier configuration of a container, or the DEFAULT one."""
+    return LXC_TIER_ASSOCIATIONS.get(str(ctid), DEFAULT_TIER)
+
+
+def _load_horizontal_scaling_groups(target: dict):
+    """Fill `target` with the horizontal scaling group configurations."""
+    target.clear()
+    for section, group_config in config.items():
+        if section.startswith('HORIZONTAL_SCALING_GROUP_'):
+            if group_config.get('lxc_containers'):
+                group_config['lxc_containers'] = set(
+                    map(str, group_config.get('lxc_containers', []))
+                )
+                target[section] = group_config
+
+
 # LXC tier configurations
+DEFAULT_TIER = None
 LXC_TIER_ASSOCIATIONS = {}
-for section, tier_config in config.items():
-    if section.startswith('TIER_'):
-        nodes = tier_config.get('lxc_containers', [])
-        for ctid in nodes:
-            LXC_TIER_ASSOCIATIONS[str(ctid)] = tier_config
+_load_tier_associations(LXC_TIER_ASSOCIATIONS)
 
 # Horizontal scaling group configurations
 HORIZONTAL_SCALING_GROUPS = {}
-for section, group_config in config.items():
-    if section.startswith('HORIZONTAL_SCALING_GROUP_'):
-        if group_config.get('lxc_containers'):
-            group_config['lxc_containers'] = set(
-                map(str, group_config.get('lxc_containers', []))
-            )
-            HORIZONTAL_SCALING_GROUPS[section] = group_config
+_load_horizontal_scaling_groups(HORIZONTAL_SCALING_GROUPS)
+
+
+def reload_config() -> bool:
+    """
+    Re-read CONFIG_FILE and refresh the loaded configuration in place.
+
+    Nothing is parsed when the file's mtime and size match the loaded version.
+
+    Dictionaries, sets and SETTINGS are updated rather than rebound, so modules
+    that imported them by name see the new values on their next use. Thresholds,
+    tiers, reserves, off-peak hours, behaviour, ignore_lxc, horizontal scaling
+    groups, notification and SSH settings take effect on the next cycle.
+
+    These keys only take effect after a restart:
+        - poll_interval and energy_mode: the main loop receives them once, from
+          the command line arguments that default to them.
+        - use_remote_proxmox: kept deliberately, switching modes at runtime is
+          not supported.
+        - log_file, lock_file and backup_dir: the files are opened or created
+          at startup.
+
+    Returns:
+        bool: True if the configuration was reloaded, False if the file is unchanged.
+
+    Raises:
+        OSError, yaml.YAMLError: If the file cannot be read or parsed; the
+        current configuration is left untouched in that case.
+    """
+    global RESERVE_CPU_PERCENT, RESERVE_MEMORY_MB, OFF_PEAK_START, OFF_PEAK_END, BEHAVIOUR  # pylint: disable=global-statement
+    global _loaded_stamp  # pylint: disable=global-statement
+
+    stamp = _config_stamp()
+    if stamp == _loaded_stamp:
+        return False
+    new_config = _read_config_file()
+    _loaded_stamp = stamp
+    config.clear()
+    config.update(new_config)
+    DEFAULTS.clear()
+    DEFAULTS.update(config.get('DEFAULT', {}))
+
+    settings = replace(_load_settings(), use_remote_proxmox=SETTINGS.use_remote_proxmox)
+    for field in fields(Settings):
+        setattr(SETTINGS, field.name, getattr(settings, field.name))
+
+    RESERVE_CPU_PERCENT = SETTINGS.reserve_cpu_percent
+    RESERVE_MEMORY_MB = SETTINGS.reserve_memory_mb
+    OFF_PEAK_START = SETTINGS.off_peak_start
+    OFF_PEAK_END = SETTINGS.off_peak_end
+    BEHAVIOUR = SETTINGS.behaviour
+
+    IGNORE_LXC.clear()
+    IGNORE_LXC.update(map(str, get_config_value('DEFAULT', 'ignore_lxc', [])))
+    _load_tier_associations(LXC_TIER_ASSOCIATIONS)
+    _load_horizontal_scaling_groups(HORIZONTAL_SCALING_GROUPS)
+    return True
+
 
 __all__ = [
     'CONFIG_FILE', 'DEFAULTS', 'LOG_FILE', 'LOCK_FILE', 'BACKUP_DIR',
     'RESERVE_CPU_PERCENT', 'RESERVE_MEMORY_MB', 'OFF_PEAK_START',
     'OFF_PEAK_END', 'IGNORE_LXC', 'BEHAVIOUR', 'PROXMOX_HOSTNAME',
-    'get_config_value', 'HORIZONTAL_SCALING_GROUPS', 'LXC_TIER_ASSOCIATIONS'
+    'get_config_value', 'HORIZONTAL_SCALING_GROUPS', 'LXC_TIER_ASSOCIATIONS',
+    'TierConfig', 'DEFAULT_TIER', 'get_tier_config',
+    'Settings', 'SETTINGS', 'reload_config'
 ]
@@ -14,23 +14,31 @@ def acquire_lock():
     Context manager to acquire a lock on the lock file.
     This prevents multiple instances of the script from running concurrently.
     
-    The lock is achieved by opening a file in write mode and applying an exclusive lock.
-    If the lock is already held by another instance, an IOError is raised,
-    which causes the script to exit.
+    The lock file is opened without truncation and an exclusive flock is applied
+    to its descriptor, which is held for as long as the context is active.
+    The owner's PID is then written to the file to make stale locks easy to debug.
+    If the lock is already held by another instance, the script exits.
     
     The lock is automatically released when the context manager exits.
     """
-    # Open the lock file for writing
-    lock_file = open(LOCK_FILE, 'w')
+    # Open (or create) the lock file without truncating it; os.open descriptors
+    # are non-inheritable, so `pct` and other child processes never hold the lock
+    lock_fd = os.open(LOCK_FILE, os.O_RDWR | os.O_CREAT, 0o644)
     try:
         # Try to acquire an exclusive lock on the file (non-blocking)
-        fcntl.lockf(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
-        # Yield control back to the calling context, keeping the lock in place
-        yield lock_file
-    except IOError:
+        fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
         # If the lock is already held by another process, log an error and exit
-        logging.error("Another instance of the script is already running. Exiting to avoid overlap.")
+        holder = os.read(lock_fd, 32).decode('ascii', 'replace').strip() or 'unknown'
+        os.close(lock_fd)
+        logging.error("Another instance of the script is already running (PID %s). Exiting to avoid overlap.", holder)
         sys.exit(1)
+    # Only the lock owner replaces the previous PID
+    os.ftruncate(lock_fd, 0)
+    os.write(lock_fd, f"{os.getpid()}\n".encode('ascii'))
+    try:
+        # Yield control back to the calling context, keeping the lock in place
+        yield lock_fd
     finally:
-        # Ensure the lock file is closed when done, releasing the lock
-        lock_file.close()
+        # Ensure the descriptor is closed when done, releasing the lock
+        os.close(lock_fd)
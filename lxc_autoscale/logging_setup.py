@@ -1,32 +1,64 @@
+import atexit  # Stops the log listener thread on exit
 import logging  # Import the logging module to handle logging throughout the application
+import queue  # Hands log records over to the listener thread
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler  # Log I/O off the calling threads, bounded log size
 from config import get_config_value  # Import the get_config_value function to retrieve configuration settings
 
 # Retrieve the log file path from the configuration
 LOG_FILE = get_config_value('DEFAULT', 'log_file', '/var/log/lxc_autoscale.log')
 
+# Size at which the log file is rotated, and how many rotated files are kept
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+
+class CachedTimeFormatter(logging.Formatter):
+    """
+    Formatter that formats the timestamp once per second instead of once per record.
+    Only valid for second-resolution date formats, such as the ones used here.
+    """
+    def __init__(self, fmt=None, datefmt=None):
+        super().__init__(fmt, datefmt)
+        self._cached_second = None
+        self._cached_time = None
+
+    def formatTime(self, record, datefmt=None):
+        second = int(record.created)
+        if second != self._cached_second:
+            self._cached_time = super().formatTime(record, datefmt)
+            self._cached_second = second
+        return self._cached_time
+
 def setup_logging():
     """
     Set up the logging configuration for the application.
     This function configures logging to write to both a log file and the console.
     
     Log messages will include timestamps and the severity level of the message.
+    Records are handed to a background thread, so callers never wait on file or console I/O.
     """
     
-    # Configure the logging to write to a file with the specified format and date format
-    logging.basicConfig(
-        filename=LOG_FILE,  # Log file path
-        level=logging.INFO,  # Log level: INFO (this can be adjusted to DEBUG, WARNING, etc.)
-        format='%(asctime)s - %(levelname)s - %(message)s',  # Format of log messages
+    # Open the log file lazily, on the first record actually written, and rotate it before it grows unbounded
+    file_handler = RotatingFileHandler(LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, delay=True)
+    file_handler.setFormatter(CachedTimeFormatter(
+        '%(asctime)s - %(levelname)s - %(message)s',  # Format of log messages
         datefmt='%Y-%m-%d %H:%M:%S'  # Date format for timestamps
-    )
+    ))
 
     # Create a console handler to output log messages to the console
     console = logging.StreamHandler()
     console.setLevel(logging.INFO)  # Set the logging level for the console output
 
     # Define the format for console log messages
-    formatter = logging.Formatter('%(asctime)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+    formatter = CachedTimeFormatter('%(asctime)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
     console.setFormatter(formatter)  # Apply the format to the console handler
 
-    # Add the console handler to the root logger, so it outputs to both file and console
-    logging.getLogger().addHandler(console)
+    # Both handlers are driven by a listener thread; the root logger only enqueues records
+    log_queue = queue.Queue()
+    listener = QueueListener(log_queue, file_handler, console, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)  # Flush records still in the queue on exit
+
+    # Configure the root logger to feed the queue; the formatting happens in the listener's handlers
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)  # Log level: INFO (this can be adjusted to DEBUG, WARNING, etc.)
+    root.addHandler(QueueHandler(log_queue))
@@ -1,13 +1,12 @@
-from config import config
-import paramiko
 # Importing necessary modules and functions
-from config import get_config_value, LOG_FILE, DEFAULTS, BACKUP_DIR, PROXMOX_HOSTNAME, IGNORE_LXC  # Importing configuration constants and utility functions
+from config import get_config_value, LOG_FILE, DEFAULTS, SETTINGS, BACKUP_DIR, PROXMOX_HOSTNAME, IGNORE_LXC  # Importing configuration constants and utility functions
 from logging_setup import setup_logging  # Importing the logging setup function
 from lock_manager import acquire_lock  # Function to acquire a lock, ensuring only one instance of the script runs
-from lxc_utils import get_containers, rollback_container_settings  # Utility functions for managing LXC containers
-from resource_manager import main_loop  # Main loop function that handles the resource allocation and scaling process
+from lxc_utils import EXECUTOR, get_containers, rollback_container_settings  # Utility functions for managing LXC containers
+from resource_manager import main_loop, request_reload, request_shutdown  # Main loop and its signal triggers
 import argparse  # Module for parsing command-line arguments
 import logging  # Module for logging events and errors
+import signal  # Used to reload the configuration on SIGHUP
 
 # Function to parse command-line arguments
 def parse_arguments():
@@ -23,7 +22,7 @@ def parse_arguments():
     parser.add_argument(
         "--poll_interval",
         type=int,
-        default=DEFAULTS.get('poll_interval', 300),
+        default=SETTINGS.poll_interval,
         help="Polling interval in seconds"  # How often the main loop should run
     )
 
@@ -31,7 +30,7 @@ def parse_arguments():
     parser.add_argument(
         "--energy_mode",
         action="store_true",
-        default=DEFAULTS.get('energy_mode', False),
+        default=SETTINGS.energy_mode,
         help="Enable energy efficiency mode during off-peak hours"  # Reduces resource allocation during low-usage periods
     )
 
@@ -58,11 +57,16 @@ if __name__ == "__main__":
             if args.rollback:
                 # If the rollback argument is provided, start the rollback process
                 logging.info("Starting rollback process...")
-                for ctid in get_containers():
-                    # Rollback settings for each container
-                    rollback_container_settings(ctid)
+                # Rollback settings for all containers concurrently, one `pct set` each
+                for _ in EXECUTOR.map(rollback_container_settings, get_containers()):
+                    pass
                 logging.info("Rollback process completed.")
             else:
+                # Reload the configuration on SIGHUP instead of terminating
+                signal.signal(signal.SIGHUP, lambda signum, frame: request_reload())
+                # Stop cooperatively so no `pct set` is cut off halfway and the lock is released cleanly
+                signal.signal(signal.SIGTERM, lambda signum, frame: request_shutdown())
+                signal.signal(signal.SIGINT, lambda signum, frame: request_shutdown())
                 # If not rolling back, enter the main loop to manage resources
                 main_loop(args.poll_interval, args.energy_mode)
         finally:
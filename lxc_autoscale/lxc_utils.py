@@ -1,28 +1,103 @@
 """Utility functions for LXC container management and monitoring."""
 
+import atexit
 import json
 import logging
 import os
+import queue
+import re
+import shlex
 import subprocess
 import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from datetime import datetime
-from threading import Lock
+from threading import Lock, Thread
 
+from config import (BACKUP_DIR, IGNORE_LXC, LOG_FILE, PROXMOX_HOSTNAME, SETTINGS,
+                   get_tier_config)
+
+# Paramiko is slow to import and only needed to reach a remote Proxmox host
+paramiko = None
+if SETTINGS.use_remote_proxmox:
+    try:
+        import paramiko
+    except ImportError:
+        logging.error("Paramiko package not installed. SSH functionality disabled.")
+
+# orjson is optional; when installed it serializes the JSON event log faster
 try:
-    import paramiko
+    import orjson
 except ImportError:
-    logging.error("Paramiko package not installed. SSH functionality disabled.")
+    orjson = None
+
+# Last cgroup CPU sample per container: (monotonic time, usage_usec)
+_cpu_samples = {}
+
+# Parsed cores/memory per container, keyed by the config file mtime they were read at
+_settings_cache = {}
+
+# Last aggregate /proc/stat sample per container: (total jiffies, idle jiffies)
+_stat_samples = {}
+
+# Last (cores, memory) written to each container's backup file
+_last_backup = {}
+
+# Set once BACKUP_DIR has been created during this run
+_backup_dir_ready = False
+
+# Persistent SSH connection to the remote Proxmox host, see _get_ssh_client()
+_ssh_client = None
+_ssh_lock = Lock()
+
+# Host totals: the core count is fixed, memory is cached as (monotonic time, MB)
+_host_cores = None
+_host_memory = (0.0, None)
+
+# Per-container usage published by pvestatd, as (monotonic time, {ctid: entry}),
+# and the remote node's name used to pick this node's entries
+_resource_snapshot = (0.0, {})
+_node_name = None
 
-from config import (BACKUP_DIR, DEFAULTS, IGNORE_LXC, LOG_FILE, LXC_TIER_ASSOCIATIONS,
-                   PROXMOX_HOSTNAME, config)
+# Seconds a resource snapshot stays valid for the probes of the same poll
+RESOURCE_SNAPSHOT_TTL = 30
 
-lock = Lock()
+# Upper bound on concurrent per-container probes and `pct set` calls
+MAX_WORKERS = 32
+
+# Shared pool for blocking per-container I/O (pct calls, file reads). Worker
+# threads are only spawned on demand and idle ones are reused, so a poll never
+# runs more than min(MAX_WORKERS, containers) threads. The work is I/O wait, so
+# the bound does not depend on the host core count.
+EXECUTOR = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='lxc-autoscale')
+
+# Fixed commands, built once as argv lists so they run without a shell
+CMD_PCT_LIST = ["pct", "list"]
+CMD_NPROC = ["nproc"]
+CMD_FREE = ["free", "-m"]
+CMD_HOSTNAME = ["hostname"]
+CMD_CLUSTER_RESOURCES = ["pvesh", "get", "/cluster/resources", "--type", "vm", "--output-format", "json"]
+
+PVE_LXC_CONFIG_DIR = '/etc/pve/lxc'
+CGROUP_LXC_DIR = '/sys/fs/cgroup/lxc'
+# Marks the end of `pct config` output in the batched container probe
+PROBE_SEPARATOR = '---lxc-autoscale-probe---'
+# Matches the "cores: N" and "memory: N" lines of a container configuration
+CONFIG_VALUE_RE = re.compile(r'^(cores|memory):\s*(\d+)\s*$', re.M)
+# Matches the two /proc/meminfo lines needed for the memory usage
+MEMINFO_VALUE_RE = re.compile(r'^(MemTotal|MemAvailable):\s*(\d+)', re.M)
+
+# Scaling events are appended to the JSON log by a single background writer
+_json_event_queue = queue.Queue()
+_json_writer = None
+_json_writer_lock = Lock()
 
 
 def run_command(cmd, timeout=30):
-    """Execute a command locally or remotely based on configuration."""
-    use_remote_proxmox = config.get('DEFAULT', {}).get('use_remote_proxmox', False)
+    """Execute a command locally or remotely based on configuration.
+
+    cmd should be an argv list, which runs without a shell; a string is only
+    passed through a shell for deliberate pipelines such as probe_container().
+    """
+    use_remote_proxmox = SETTINGS.use_remote_proxmox
     logging.debug("Inside run_command: use_remote_proxmox = %s", use_remote_proxmox)
     return (run_remote_command if use_remote_proxmox else run_local_command)(cmd, timeout)
 
@@ -30,68 +105,254 @@ def run_command(cmd, timeout=30):
 def run_local_command(cmd, timeout=30):
     """Execute a command locally with timeout."""
     try:
-        result = subprocess.check_output(
-            cmd, shell=True, timeout=timeout, stderr=subprocess.STDOUT
-        ).decode('utf-8').strip()
+        result = subprocess.run(
+            cmd, shell=isinstance(cmd, str), timeout=timeout, check=True,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        ).stdout.decode('utf-8').strip()
         logging.debug("Command '%s' executed successfully. Output: %s", cmd, result)
         return result
     except subprocess.TimeoutExpired:
         logging.error("Command '%s' timed out after %d seconds", cmd, timeout)
     except subprocess.CalledProcessError as e:
-        logging.error("Command '%s' failed: %s", cmd, e.output.decode('utf-8'))
+        logging.error("Command '%s' failed: %s", cmd, e.stderr.decode('utf-8'))
     except Exception as e:  # pylint: disable=broad-except
         logging.error("Unexpected error executing '%s': %s", cmd, str(e))
     return None
 
 
+def _get_ssh_client():
+    """Return the shared SSH client, (re)connecting when the transport is down.
+
+    Commands run as separate channels over one connection, so the parallel
+    probes do not each pay for a TCP connect, key exchange and login.
+    Returns None when paramiko is not installed.
+    """
+    global _ssh_client  # pylint: disable=global-statement
+    if paramiko is None:
+        logging.error("Paramiko package not installed. Cannot run remote commands.")
+        return None
+    with _ssh_lock:
+        transport = _ssh_client.get_transport() if _ssh_client else None
+        if transport is None or not transport.is_active():
+            if _ssh_client:
+                _ssh_client.close()
+            _ssh_client = None
+            ssh = paramiko.SSHClient()
+            ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+            ssh.connect(
+                hostname=SETTINGS.proxmox_host,
+                port=SETTINGS.ssh_port,
+                username=SETTINGS.ssh_user,
+                password=SETTINGS.ssh_password,
+                key_filename=SETTINGS.ssh_key_path
+            )
+            _ssh_client = ssh
+        return _ssh_client
+
+
+def _close_ssh_client():
+    """Drop the shared SSH client so the next command reconnects."""
+    global _ssh_client  # pylint: disable=global-statement
+    with _ssh_lock:
+        if _ssh_client:
+            _ssh_client.close()
+        _ssh_client = None
+
+
 def run_remote_command(cmd, timeout=30):
     """Execute a command on remote Proxmox host via SSH."""
+    if not isinstance(cmd, str):
+        cmd = shlex.join(cmd)
     logging.debug("Running remote command: %s", cmd)
-    ssh = None
     try:
-        ssh = paramiko.SSHClient()
-        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        ssh.connect(
-            hostname=config.get('DEFAULT', {}).get('proxmox_host'),
-            port=config.get('DEFAULT', {}).get('ssh_port', 22),
-            username=config.get('DEFAULT', {}).get('ssh_user'),
-            password=config.get('DEFAULT', {}).get('ssh_password'),
-            key_filename=config.get('DEFAULT', {}).get('ssh_key_path')
-        )
+        ssh = _get_ssh_client()
+        if ssh is None:
+            return None
         _, stdout, _ = ssh.exec_command(cmd, timeout=timeout)
         output = stdout.read().decode('utf-8').strip()
         logging.debug("Remote command '%s' executed successfully: %s", cmd, output)
         return output
     except paramiko.SSHException as e:
         logging.error("SSH execution failed: %s", str(e))
+        _close_ssh_client()
     except Exception as e:  # pylint: disable=broad-except
         logging.error("Unexpected SSH error executing '%s': %s", cmd, str(e))
-    finally:
-        if ssh:
-            ssh.close()
     return None
 
 
+def _get_node_name():
+    """Return the Proxmox node name of the remote host, queried once."""
+    global _node_name  # pylint: disable=global-statement
+    if _node_name is None:
+        output = run_command(CMD_HOSTNAME)
+        if output:
+            _node_name = output.split('.', 1)[0]
+    return _node_name
+
+
+def get_node_container_resources():
+    """Return {ctid: entry} for this node's containers from one `pvesh` call, or None.
+
+    The entries carry status, cpu (fraction of the allocated cores), mem and
+    maxmem as published by pvestatd, so no per-container `pct exec` is needed.
+    """
+    global _resource_snapshot  # pylint: disable=global-statement
+    node = _get_node_name()
+    output = run_command(CMD_CLUSTER_RESOURCES)
+    if not node or not output:
+        return None
+    try:
+        entries = json.loads(output)
+    except ValueError as e:
+        logging.warning("Failed to parse pvesh resources: %s", str(e))
+        return None
+    resources = {
+        str(entry['vmid']): entry for entry in entries
+        if entry.get('type') == 'lxc' and entry.get('node') == node and str(entry.get('vmid')) not in IGNORE_LXC
+    }
+    _resource_snapshot = (time.monotonic(), resources)
+    return resources
+
+
+def _local_container_statuses():
+    """Derive {ctid: status} from the node's config files and the host cgroup tree.
+
+    A container is running exactly while its cgroup exists, so neither
+    `pct list` nor any other process is needed. Returns None when the
+    cgroup v2 layout is not available.
+    """
+    if not os.path.isdir(CGROUP_LXC_DIR):
+        return None
+    try:
+        names = os.listdir(PVE_LXC_CONFIG_DIR)
+    except OSError as e:
+        logging.debug("Cannot list %s: %s", PVE_LXC_CONFIG_DIR, str(e))
+        return None
+    statuses = {}
+    for name in names:
+        ctid, ext = os.path.splitext(name)
+        if ext == '.conf' and ctid.isdigit() and ctid not in IGNORE_LXC:
+            statuses[ctid] = 'running' if os.path.isdir(os.path.join(CGROUP_LXC_DIR, ctid)) else 'stopped'
+    return statuses
+
+
+def get_container_statuses():
+    """Return {ctid: status}, excluding ignored containers.
+
+    Remote hosts are asked through one `pvesh` call that also snapshots
+    container usage for get_container_usage(); local hosts are listed from
+    /etc/pve/lxc and the cgroup tree. Otherwise, and as a fallback, a
+    single `pct list` is parsed.
+    """
+    if SETTINGS.use_remote_proxmox:
+        resources = get_node_container_resources()
+        if resources is not None:
+            return {ctid: entry.get('status', 'unknown') for ctid, entry in resources.items()}
+    else:
+        statuses = _local_container_statuses()
+        if statuses is not None:
+            return statuses
+    output = run_command(CMD_PCT_LIST)
+    statuses = {}
+    for line in (output or "").splitlines()[1:]:
+        fields = line.split()
+        if len(fields) >= 2 and fields[0] not in IGNORE_LXC:
+            statuses[fields[0]] = fields[1].lower()
+    return statuses
+
+
 def get_containers():
     """Return list of container IDs, excluding ignored ones."""
-    containers = run_command("pct list | awk 'NR>1 {print $1}'")
-    return [ctid for ctid in containers.splitlines() if ctid not in IGNORE_LXC]
+    return list(get_container_statuses())
 
 
 def is_container_running(ctid):
     """Check if container is running."""
-    status = run_command(f"pct status {ctid}")
+    status = run_command(["pct", "status", str(ctid)])
     return status and "status: running" in status.lower()
 
 
+def read_container_config(ctid):
+    """Return the current configuration of a container as 'key: value' text.
+
+    Locally the file under /etc/pve/lxc is read directly, skipping the
+    snapshot sections that follow the current configuration. Remote hosts
+    and unreadable files fall back to `pct config`.
+    """
+    if not SETTINGS.use_remote_proxmox:
+        try:
+            with open(os.path.join(PVE_LXC_CONFIG_DIR, f"{ctid}.conf"), 'r', encoding='utf-8') as f:
+                return f.read().split('\n[', 1)[0]
+        except OSError as e:
+            logging.debug("Falling back to pct config for %s: %s", ctid, str(e))
+    return run_command(["pct", "config", str(ctid)])
+
+
+def get_container_settings(ctid):
+    """Return the configured cores and memory of a container.
+
+    Locally the parsed values are cached until the container's config file
+    changes, so steady containers only cost a stat() per poll.
+
+    Raises:
+        ValueError: If either value is missing from the configuration.
+    """
+    if SETTINGS.use_remote_proxmox:
+        return _parse_container_settings(ctid, read_container_config(ctid))
+    try:
+        mtime = os.stat(os.path.join(PVE_LXC_CONFIG_DIR, f"{ctid}.conf")).st_mtime_ns
+    except OSError:
+        mtime = None
+    cached = _settings_cache.get(ctid)
+    if mtime is not None and cached and cached[0] == mtime:
+        return dict(cached[1])
+    settings = _parse_container_settings(ctid, read_container_config(ctid))
+    if mtime is not None:
+        _settings_cache[ctid] = (mtime, settings)
+    return dict(settings)
+
+
+def _parse_container_settings(ctid, config_text):
+    """Extract cores and memory from container configuration text."""
+    values = dict(CONFIG_VALUE_RE.findall(config_text or ""))
+    if 'cores' not in values or 'memory' not in values:
+        raise ValueError(f"Failed to extract valid cores or memory values for container {ctid}")
+    return {"cores": int(values['cores']), "memory": int(values['memory'])}
+
+
+def apply_container_settings(ctid, settings):
+    """Apply several `pct set` options to a container with a single call."""
+    argv = ["pct", "set", str(ctid)]
+    for key, value in settings.items():
+        argv += [f"-{key}", str(value)]
+    # Never trust a cached read across our own write, even within the mtime granularity
+    _settings_cache.pop(str(ctid), None)
+    return run_command(argv)
+
+
 def backup_container_settings(ctid, settings):
-    """Backup container configuration to JSON file."""
+    """Backup container configuration to JSON file.
+
+    Each container is written once per run and again only when its
+    settings change. Writes go through a temporary file so a crash can
+    never leave a truncated backup behind.
+    """
+    global _backup_dir_ready  # pylint: disable=global-statement
+    cores, memory = int(settings['cores']), int(settings['memory'])
+    if _last_backup.get(ctid) == (cores, memory):
+        return
     try:
-        os.makedirs(BACKUP_DIR, exist_ok=True)
+        if not _backup_dir_ready:
+            os.makedirs(BACKUP_DIR, exist_ok=True)
+            _backup_dir_ready = True
         backup_file = os.path.join(BACKUP_DIR, f"{ctid}_backup.json")
-        with lock:
-            with open(backup_file, 'w', encoding='utf-8') as f:
-                json.dump(settings, f)
+        # Each container has its own file and os.replace is atomic, so no lock is needed
+        tmp_file = f"{backup_file}.tmp.{os.getpid()}"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            # Fixed two-key document, same bytes json.dump would produce
+            f.write(f'{{"cores": {cores}, "memory": {memory}}}')
+        os.replace(tmp_file, backup_file)
+        _last_backup[ctid] = (cores, memory)
         logging.debug("Backup saved for container %s: %s", ctid, settings)
     except Exception as e:  # pylint: disable=broad-except
         logging.error("Failed to backup settings for %s: %s", ctid, str(e))
@@ -101,12 +362,11 @@ def load_backup_settings(ctid):
     """Load container configuration from backup JSON file."""
     try:
         backup_file = os.path.join(BACKUP_DIR, f"{ctid}_backup.json")
-        if os.path.exists(backup_file):
-            with lock:
-                with open(backup_file, 'r', encoding='utf-8') as f:
-                    settings = json.load(f)
-            logging.debug("Loaded backup for container %s: %s", ctid, settings)
-            return settings
+        with open(backup_file, 'r', encoding='utf-8') as f:
+            settings = json.load(f)
+        logging.debug("Loaded backup for container %s: %s", ctid, settings)
+        return settings
+    except FileNotFoundError:
         logging.warning("No backup found for container %s", ctid)
         return None
     except Exception as e:  # pylint: disable=broad-except
@@ -119,28 +379,122 @@ def rollback_container_settings(ctid):
     settings = load_backup_settings(ctid)
     if settings:
         logging.info("Rolling back container %s to backup settings", ctid)
-        run_command(f"pct set {ctid} -cores {settings['cores']}")
-        run_command(f"pct set {ctid} -memory {settings['memory']}")
+        apply_container_settings(ctid, {"cores": settings['cores'], "memory": settings['memory']})
+
+
+def _encode_json_lines(events):
+    """Encode events as newline-terminated JSON lines, using orjson when available.
+
+    The stdlib fallback is configured to produce the same bytes as orjson
+    (compact separators, UTF-8 instead of \\u escapes).
+    """
+    if orjson is not None:
+        return b''.join(orjson.dumps(event) + b'\n' for event in events)
+    return ''.join(
+        json.dumps(event, separators=(',', ':'), ensure_ascii=False) + '\n' for event in events
+    ).encode('utf-8')
+
+
+def _json_event_writer():
+    """Drain queued JSON events and append them to the JSON log in batches."""
+    json_log_file = LOG_FILE.replace('.log', '.json')
+    f = None
+    while True:
+        batch = [_json_event_queue.get()]
+        while True:
+            try:
+                batch.append(_json_event_queue.get_nowait())
+            except queue.Empty:
+                break
+        events = [event for event in batch if event is not None]
+        if events:
+            try:
+                # Opened once and kept for the life of the writer; reopened after a failed write
+                if f is None:
+                    f = open(json_log_file, 'ab')  # pylint: disable=consider-using-with
+                f.write(_encode_json_lines(events))
+                f.flush()
+            except Exception as e:  # pylint: disable=broad-except
+                logging.error("Failed to write %d JSON events: %s", len(events), str(e))
+                if f is not None:
+                    try:
+                        f.close()
+                    except OSError:
+                        pass
+                    f = None
+        for _ in batch:
+            _json_event_queue.task_done()
+        if len(events) < len(batch):
+            if f is not None:
+                f.close()
+            return
+
+
+def _start_json_writer():
+    """Start the JSON event writer thread if it is not running yet."""
+    global _json_writer  # pylint: disable=global-statement
+    with _json_writer_lock:
+        if _json_writer is None:
+            _json_writer = Thread(target=_json_event_writer, name="json-event-writer", daemon=True)
+            _json_writer.start()
+            atexit.register(flush_json_events)
+
+
+def flush_json_events():
+    """Stop the JSON event writer after all queued events are on disk."""
+    if _json_writer is not None and _json_writer.is_alive():
+        _json_event_queue.put(None)
+        _json_writer.join()
 
 
 def log_json_event(ctid, action, resource_change):
-    """Log container change events in JSON format."""
+    """Queue a container change event for the JSON log."""
     log_data = {
-        "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "timestamp": time.strftime('%Y-%m-%d %H:%M:%S'),
         "proxmox_host": PROXMOX_HOSTNAME,
         "container_id": ctid,
         "action": action,
         "change": resource_change
     }
-    with lock:
-        with open(LOG_FILE.replace('.log', '.json'), 'a', encoding='utf-8') as json_log_file:
-            json_log_file.write(json.dumps(log_data) + '\n')
+    if _json_writer is None:
+        _start_json_writer()
+    _json_event_queue.put(log_data)
+
+
+def _host_total_cores():
+    """Return the host core count, queried once since it cannot change at runtime."""
+    global _host_cores  # pylint: disable=global-statement
+    if _host_cores is None:
+        if SETTINGS.use_remote_proxmox:
+            _host_cores = int(run_command(CMD_NPROC))
+        else:
+            _host_cores = os.cpu_count()
+    return _host_cores
+
+
+def _host_total_memory():
+    """Return the host memory in MB, re-read at most once per poll interval."""
+    global _host_memory  # pylint: disable=global-statement
+    checked_at, total_memory = _host_memory
+    if total_memory is None or time.monotonic() - checked_at >= SETTINGS.poll_interval:
+        if SETTINGS.use_remote_proxmox:
+            total_memory = next((
+                int(line.split()[1]) for line in (run_command(CMD_FREE) or "").splitlines()
+                if line.startswith('Mem:')
+            ), None)
+            if total_memory is None:
+                raise ValueError("`free -m` on the remote host returned no memory line")
+        else:
+            # Same figure as MemTotal, without opening and scanning /proc/meminfo
+            total_memory = os.sysconf('SC_PHYS_PAGES') * os.sysconf('SC_PAGE_SIZE') // (1024 * 1024)
+        _host_memory = (time.monotonic(), total_memory)
+    return total_memory
 
 
 def get_total_cores():
     """Calculate available CPU cores after reserving percentage."""
-    total_cores = int(run_command("nproc"))
-    reserved_cores = max(1, int(total_cores * DEFAULTS['reserve_cpu_percent'] / 100))
+    total_cores = _host_total_cores()
+    reserved_cores = max(1, int(total_cores * SETTINGS.reserve_cpu_percent / 100))
     available_cores = total_cores - reserved_cores
     logging.debug(
         "Total cores: %d, Reserved: %d, Available: %d",
@@ -152,36 +506,130 @@ def get_total_cores():
 def get_total_memory():
     """Calculate available memory after reserving fixed amount."""
     try:
-        command_output = run_command("free -m | awk '/^Mem:/ {print $2}'")
-        total_memory = int(command_output.strip()) if command_output else 0
-    except (ValueError, subprocess.CalledProcessError) as e:
+        total_memory = _host_total_memory()
+    except (OSError, TypeError, ValueError, StopIteration) as e:
         logging.error("Failed to get total memory: %s", str(e))
         total_memory = 0
 
-    available_memory = max(0, total_memory - DEFAULTS['reserve_memory_mb'])
+    available_memory = max(0, total_memory - SETTINGS.reserve_memory_mb)
     logging.debug(
         "Total memory: %dMB, Reserved: %dMB, Available: %dMB",
-        total_memory, DEFAULTS['reserve_memory_mb'], available_memory
+        total_memory, SETTINGS.reserve_memory_mb, available_memory
     )
     return available_memory
 
 
-def get_cpu_usage(ctid):
-    """Get container CPU usage using multiple fallback methods."""
-    def run_cmd(command):
-        try:
-            result = subprocess.run(
-                command, shell=True, capture_output=True, text=True, check=True
-            )
-            return result.stdout.strip()
-        except subprocess.CalledProcessError as e:
-            logging.warning("Command failed: %s, Error: %s", command, str(e))
-            return ""
-
+def _read_cgroup_file(ctid, name):
+    """Read a file from the host-side cgroup v2 directory of a container."""
+    with open(os.path.join(CGROUP_LXC_DIR, str(ctid), name), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def _count_cpus(cpu_list):
+    """Count the CPUs in a cpuset list such as '0-3,6'."""
+    count = 0
+    for part in cpu_list.strip().split(','):
+        if '-' in part:
+            start, end = part.split('-')
+            count += int(end) - int(start) + 1
+        elif part:
+            count += 1
+    return count
+
+
+def _cgroup_cpu_usec(ctid):
+    """Return the cumulative CPU time of a container in microseconds."""
+    for line in _read_cgroup_file(ctid, 'cpu.stat').splitlines():
+        if line.startswith('usage_usec '):
+            return int(line.split()[1])
+    raise ValueError("usage_usec missing from cpu.stat")
+
+
+def _cgroup_cpu_usage(ctid, cores=None):
+    """Compute CPU usage from the delta of the cgroup CPU time between polls."""
+    if not cores:
+        cores = _count_cpus(_read_cgroup_file(ctid, 'cpuset.cpus.effective'))
+    now, usec = time.monotonic(), _cgroup_cpu_usec(ctid)
+    previous = _cpu_samples.get(ctid)
+    if previous is None or usec < previous[1]:
+        # First sighting (or restarted container): measure over a short window
+        time.sleep(1)
+        previous = (now, usec)
+        now, usec = time.monotonic(), _cgroup_cpu_usec(ctid)
+    _cpu_samples[ctid] = (now, usec)
+    elapsed_usec = (now - previous[0]) * 1_000_000
+    if elapsed_usec <= 0 or not cores:
+        raise ValueError("No CPU time window to compare against.")
+    return round(max(min(100.0 * (usec - previous[1]) / (elapsed_usec * cores), 100.0), 0.0), 2)
+
+
+def _cgroup_memory_usage(ctid):
+    """Compute memory usage percentage from the cgroup counters."""
+    limit = _read_cgroup_file(ctid, 'memory.max').strip()
+    if limit == 'max':
+        raise ValueError("Container has no memory limit.")
+    current = int(_read_cgroup_file(ctid, 'memory.current'))
+    inactive_file = 0
+    for line in _read_cgroup_file(ctid, 'memory.stat').splitlines():
+        if line.startswith('inactive_file '):
+            inactive_file = int(line.split()[1])
+            break
+    return max(current - inactive_file, 0) * 100 / int(limit)
+
+
+def _parse_stat_line(line):
+    """Return (total, idle) jiffies from the aggregate cpu line of /proc/stat."""
+    if not line or not line.startswith('cpu '):
+        raise ValueError("Unexpected /proc/stat output.")
+    times = list(map(float, line.split()[1:]))
+    return sum(times), times[3]
+
+
+def read_container_file(ctid, path):
+    """Return the contents of a file as seen from inside a running container.
+
+    The file is read with `pct exec`, which runs `cat` inside the
+    container's full confinement (user namespace, cgroup and AppArmor
+    profile). The daemon runs as host root, so it must never execute a
+    container binary outside of that confinement.
+    """
+    return run_command(["pct", "exec", str(ctid), "--", "cat", path])
+
+
+def _proc_stat_cpu_times(ctid):
+    """Return (total, idle) jiffies from the container's /proc/stat."""
+    return _parse_stat_line((read_container_file(ctid, "/proc/stat") or "").partition('\n')[0])
+
+
+def _stat_delta_usage(previous, current):
+    """Compute CPU usage percentage between two (total, idle) samples."""
+    total_diff = current[0] - previous[0]
+    idle_diff = current[1] - previous[1]
+    if total_diff == 0:
+        raise ValueError("Total CPU time did not change.")
+    return round(max(min(100.0 * (total_diff - idle_diff) / total_diff, 100.0), 0.0), 2)
+
+
+def _meminfo_usage(meminfo):
+    """Compute memory usage percentage from /proc/meminfo text."""
+    values = dict(MEMINFO_VALUE_RE.findall(meminfo))
+    total = int(values['MemTotal'])
+    return (total - int(values['MemAvailable'])) * 100 / total
+
+
+def get_cpu_usage(ctid, cores=None):
+    """Get container CPU usage using multiple fallback methods.
+
+    The host-side cgroup counters are tried first; the `pct exec` based
+    methods are only used in remote mode or when the cgroup is unavailable.
+    Both the cgroup and /proc/stat methods diff against the previous poll's
+    sample, so only a container's first probe waits for a measuring window.
+    """
     def loadavg_method(ctid):
         try:
-            loadavg = float(run_cmd(f"pct exec {ctid} -- cat /proc/loadavg").split()[0])
-            num_cpus = int(run_cmd(f"pct exec {ctid} -- nproc"))
+            loadavg = float(read_container_file(ctid, "/proc/loadavg").split()[0])
+            # The configured core count is known already, no need for `pct exec nproc`
+            num_cpus = int(cores or run_command(["pct", "exec", ctid, "--", "nproc"]))
             if num_cpus == 0:
                 raise ValueError("Number of CPUs is zero.")
             return round(min((loadavg / num_cpus) * 100, 100.0), 2)
@@ -190,33 +638,24 @@ def get_cpu_usage(ctid):
 
     def load_method(ctid):
         try:
-            cmd = f"pct exec {ctid} -- cat /proc/stat | grep '^cpu '"
-            initial_times = list(map(float, run_cmd(cmd).split()[1:]))
-            initial_total = sum(initial_times)
-            initial_idle = initial_times[3]
-
-            time.sleep(1)
-
-            new_times = list(map(float, run_cmd(cmd).split()[1:]))
-            new_total = sum(new_times)
-            new_idle = new_times[3]
-
-            total_diff = new_total - initial_total
-            idle_diff = new_idle - initial_idle
-
-            if total_diff == 0:
-                raise ValueError("Total CPU time did not change.")
-
-            return round(
-                max(min(100.0 * (total_diff - idle_diff) / total_diff, 100.0), 0.0), 2
-            )
+            total, idle = _proc_stat_cpu_times(ctid)
+            previous = _stat_samples.get(ctid)
+            if previous is None or total < previous[0]:
+                # First sighting (or restarted container): measure over a short window
+                time.sleep(1)
+                previous = (total, idle)
+                total, idle = _proc_stat_cpu_times(ctid)
+            _stat_samples[ctid] = (total, idle)
+            return _stat_delta_usage(previous, (total, idle))
         except Exception as e:  # pylint: disable=broad-except
             raise RuntimeError("Load method failed: %s", str(e)) from e
 
     methods = [
-        ("Load Average", loadavg_method),
         ("Load", load_method),
+        ("Load Average", loadavg_method),
     ]
+    if not SETTINGS.use_remote_proxmox:
+        methods.insert(0, ("cgroup", lambda ctid: _cgroup_cpu_usage(ctid, cores)))
 
     for method_name, method in methods:
         try:
@@ -233,41 +672,104 @@ def get_cpu_usage(ctid):
 
 def get_memory_usage(ctid):
     """Get container memory usage percentage."""
-    mem_info = run_command(
-        f"pct exec {ctid} -- awk '/MemTotal/ {{t=$2}} /MemAvailable/ {{a=$2}} "
-        f"END {{print t, t-a}}' /proc/meminfo"
-    )
+    if not SETTINGS.use_remote_proxmox:
+        try:
+            return _cgroup_memory_usage(ctid)
+        except (OSError, ValueError) as e:
+            logging.debug("cgroup memory usage unavailable for %s: %s", ctid, str(e))
+    mem_info = read_container_file(ctid, "/proc/meminfo")
     if mem_info:
         try:
-            total, used = map(int, mem_info.split())
-            return (used * 100) / total
-        except ValueError:
+            return _meminfo_usage(mem_info)
+        except (KeyError, IndexError, ValueError, ZeroDivisionError):
             logging.error("Failed to parse memory info for %s: '%s'", ctid, mem_info)
     logging.error("Failed to get memory usage for %s", ctid)
     return 0.0
 
 
+def probe_container(ctid):
+    """Fetch a container's configuration, /proc/stat and /proc/meminfo in one command.
+
+    Returns:
+        tuple: (configuration text, aggregate cpu line, meminfo text).
+
+    Raises:
+        ValueError: If the command failed or its output is incomplete.
+    """
+    ctid = shlex.quote(str(ctid))
+    output = run_command(
+        f"pct config {ctid} && echo {PROBE_SEPARATOR} && "
+        f"pct exec {ctid} -- sh -c 'head -n 1 /proc/stat; cat /proc/meminfo'"
+    )
+    if not output or PROBE_SEPARATOR not in output:
+        raise ValueError("Batched probe returned no usable output.")
+    config_text, _, proc_text = output.partition(PROBE_SEPARATOR)
+    stat_line, _, meminfo = proc_text.strip().partition('\n')
+    return config_text, stat_line, meminfo
+
+
+def get_container_usage(ctid):
+    """Return (settings, cpu, mem) for a running container.
+
+    Locally everything is read from host files. In remote mode usage is
+    taken from the pvesh snapshot of the current poll when there is one,
+    leaving only the configuration to read. Otherwise the configuration and
+    the container's counters come from one batched command, with the
+    individual probes as a fallback.
+    """
+    if SETTINGS.use_remote_proxmox:
+        taken_at, resources = _resource_snapshot
+        entry = resources.get(ctid) if time.monotonic() - taken_at < RESOURCE_SNAPSHOT_TTL else None
+        if entry and entry.get('maxmem'):
+            settings = get_container_settings(ctid)
+            cpu = round(max(min(float(entry.get('cpu', 0)) * 100, 100.0), 0.0), 2)
+            logging.info("CPU usage for %s using pvesh resources: %s%%", ctid, cpu)
+            return settings, cpu, entry.get('mem', 0) * 100 / entry['maxmem']
+        try:
+            config_text, stat_line, meminfo = probe_container(ctid)
+            settings = _parse_container_settings(ctid, config_text)
+            mem = _meminfo_usage(meminfo)
+            sample = _parse_stat_line(stat_line)
+            previous = _stat_samples.get(ctid)
+            if previous is None or sample[0] < previous[0]:
+                # First sighting (or restarted container): measure over a short window
+                time.sleep(1)
+                previous, sample = sample, _proc_stat_cpu_times(ctid)
+            _stat_samples[ctid] = sample
+            cpu = _stat_delta_usage(previous, sample)
+            logging.info("CPU usage for %s using batched probe: %s%%", ctid, cpu)
+            return settings, cpu, mem
+        except (KeyError, IndexError, ValueError) as e:
+            logging.warning("Batched probe failed for %s, using individual probes: %s", ctid, str(e))
+    settings = get_container_settings(ctid)
+    return settings, get_cpu_usage(ctid, settings['cores']), get_memory_usage(ctid)
+
+
 def is_ignored(ctid):
     """Check if container is in ignore list."""
     return str(ctid) in IGNORE_LXC
 
 
-def get_container_data(ctid):
-    """Collect container resource usage data."""
-    if is_ignored(ctid) or not is_container_running(ctid):
+def get_container_data(ctid, status=None):
+    """Collect container resource usage data.
+
+    A status already known from `pct list` saves the `pct status` call.
+    """
+    if is_ignored(ctid):
+        return None
+    running = status == 'running' if status is not None else is_container_running(ctid)
+    if not running:
         return None
 
     logging.debug("Collecting data for container %s", ctid)
     try:
-        cores = int(run_command(f"pct config {ctid} | grep cores | awk '{{print $2}}'"))
-        memory = int(run_command(f"pct config {ctid} | grep memory | awk '{{print $2}}'"))
-        settings = {"cores": cores, "memory": memory}
+        settings, cpu, mem = get_container_usage(ctid)
         backup_container_settings(ctid, settings)
         return {
-            "cpu": get_cpu_usage(ctid),
-            "mem": get_memory_usage(ctid),
-            "initial_cores": cores,
-            "initial_memory": memory,
+            "cpu": cpu,
+            "mem": mem,
+            "initial_cores": settings['cores'],
+            "initial_memory": settings['memory'],
         }
     except Exception as e:  # pylint: disable=broad-except
         logging.error("Error collecting data for %s: %s", ctid, str(e))
@@ -277,20 +779,19 @@ def get_container_data(ctid):
 def collect_container_data():
     """Collect data from all containers in parallel."""
     containers = {}
-    with ThreadPoolExecutor(max_workers=2) as executor:
-        future_to_ctid = {
-            executor.submit(get_container_data, ctid): ctid 
-            for ctid in get_containers()
-        }
-        for future in as_completed(future_to_ctid):
-            ctid = future_to_ctid[future]
-            try:
-                data = future.result()
-                if data:
-                    containers[ctid] = data
-                    logging.debug("Container %s data: %s", ctid, data)
-            except Exception as e:  # pylint: disable=broad-except
-                logging.error("Error retrieving data for %s: %s", ctid, str(e))
+    future_to_ctid = {
+        EXECUTOR.submit(get_container_data, ctid, status): ctid
+        for ctid, status in get_container_statuses().items()
+    }
+    for future in as_completed(future_to_ctid):
+        ctid = future_to_ctid[future]
+        try:
+            data = future.result()
+            if data:
+                containers[ctid] = data
+                logging.debug("Container %s data: %s", ctid, data)
+        except Exception as e:  # pylint: disable=broad-except
+            logging.error("Error retrieving data for %s: %s", ctid, str(e))
     return containers
 
 
@@ -306,7 +807,9 @@ def prioritize_containers(containers):
             key=lambda item: (item[1]['cpu'], item[1]['mem']),
             reverse=True
         )
-        logging.debug("Container priorities: %s", priorities)
+        # Rendering the whole list is expensive, only do it when DEBUG is enabled
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            logging.debug("Container priorities: %s", priorities)
         return priorities
     except Exception as e:  # pylint: disable=broad-except
         logging.error("Error prioritizing containers: %s", str(e))
@@ -315,12 +818,12 @@ def prioritize_containers(containers):
 
 def get_container_config(ctid):
     """Get container tier configuration."""
-    return LXC_TIER_ASSOCIATIONS.get(ctid, DEFAULTS)
+    return get_tier_config(ctid)
 
 
 def generate_unique_snapshot_name(base_name):
     """Generate timestamped snapshot name."""
-    return f"{base_name}-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+    return f"{base_name}-{time.strftime('%Y%m%d%H%M%S')}"
 
 
 def generate_cloned_hostname(base_name, clone_number):
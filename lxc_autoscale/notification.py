@@ -1,10 +1,34 @@
+import atexit  # For flushing pending notifications on exit
 import logging  # For logging notification events and errors
+import queue  # Hands notifications over to the delivery thread
 import requests  # For sending HTTP requests (used by Gotify and Uptime Kuma)
 import smtplib  # For sending emails
 from email.mime.text import MIMEText  # For constructing email messages
 from abc import ABC, abstractmethod  # Abstract base classes for notification interfaces
+from threading import Lock, Thread  # SMTP connection guard and the delivery thread
 from config import DEFAULTS  # Configuration values
 
+# Timeout (in seconds) for HTTP based notifications
+HTTP_TIMEOUT = 5
+
+# Timeout (in seconds) for SMTP connections
+SMTP_TIMEOUT = 10
+
+# Seconds to wait on exit for queued notifications to be delivered
+FLUSH_TIMEOUT = 30
+
+# Maximum number of notifications waiting for delivery; newer ones are dropped beyond it
+NOTIFICATION_QUEUE_SIZE = 1024
+
+# Notifications waiting for the delivery thread, which is started on first use
+_notification_queue = queue.Queue(maxsize=NOTIFICATION_QUEUE_SIZE)
+_notification_worker = None
+_worker_lock = Lock()
+_dropped_notifications = 0
+
+# Shared HTTP session so connections (and TLS handshakes) are reused across notifications
+http_session = requests.Session()
+
 # Abstract base class for notification proxies
 class NotificationProxy(ABC):
     """
@@ -37,11 +61,12 @@ class GotifyNotification(NotificationProxy):
         headers = {'X-Gotify-Key': self.token}
 
         try:
-            response = requests.post(f"{self.url}/message", data=payload, headers=headers)
+            response = http_session.post(f"{self.url}/message", data=payload, headers=headers,
+                                         timeout=HTTP_TIMEOUT)
             response.raise_for_status()
-            logging.info(f"Gotify notification sent: {title} - {message}")
+            logging.info("Gotify notification sent: %s - %s", title, message)
         except requests.exceptions.RequestException as e:
-            logging.error(f"Gotify notification failed: {e}")
+            logging.error("Gotify notification failed: %s", e)
 
 # Email notification implementation
 class EmailNotification(NotificationProxy):
@@ -55,6 +80,37 @@ class EmailNotification(NotificationProxy):
         self.password = password
         self.from_addr = from_addr
         self.to_addrs = to_addrs
+        # Authenticated connection kept open between notifications
+        self._server = None
+        self._lock = Lock()
+
+    def _get_server(self):
+        """
+        Return the open SMTP connection, reconnecting only when it has been dropped.
+
+        Returns:
+            smtplib.SMTP: An authenticated SMTP connection.
+        """
+        if self._server is not None:
+            try:
+                if self._server.noop()[0] == 250:
+                    return self._server
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._close()
+        server = smtplib.SMTP(self.smtp_server, self.port, timeout=SMTP_TIMEOUT)
+        server.starttls()  # Encrypt the connection
+        server.login(self.username, self.password)  # Authenticate with the SMTP server
+        self._server = server
+        return server
+
+    def _close(self):
+        """Close the SMTP connection, ignoring errors from an already broken one."""
+        try:
+            self._server.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+        self._server = None
 
     def send_notification(self, title: str, message: str, priority: int = 5):
         """
@@ -70,14 +126,14 @@ class EmailNotification(NotificationProxy):
         msg['From'] = self.from_addr
         msg['To'] = ', '.join(self.to_addrs)
 
-        try:
-            with smtplib.SMTP(self.smtp_server, self.port) as server:
-                server.starttls()  # Encrypt the connection
-                server.login(self.username, self.password)  # Authenticate with the SMTP server
-                server.sendmail(self.from_addr, self.to_addrs, msg.as_string())  # Send the email
-            logging.info(f"Email sent: {title} - {message}")
-        except Exception as e:
-            logging.error(f"Failed to send email: {e}")
+        with self._lock:
+            try:
+                self._get_server().sendmail(self.from_addr, self.to_addrs, msg.as_string())  # Send the email
+                logging.info("Email sent: %s - %s", title, message)
+            except Exception as e:
+                logging.error("Failed to send email: %s", e)
+                if self._server is not None:
+                    self._close()
 
 # Uptime Kuma notification implementation
 class UptimeKumaNotification(NotificationProxy):
@@ -97,34 +153,136 @@ class UptimeKumaNotification(NotificationProxy):
             priority (int): Unused, but kept for interface consistency.
         """
         try:
-            response = requests.get(self.webhook_url)
+            response = http_session.get(self.webhook_url, timeout=HTTP_TIMEOUT)
             if response.status_code == 200:
                 logging.info("Uptime Kuma notification sent successfully")
             else:
-                logging.error(f"Failed to send Uptime Kuma notification: {response.status_code}")
+                logging.error("Failed to send Uptime Kuma notification: %s", response.status_code)
+        except Exception as e:
+            logging.error("Error sending Uptime Kuma notification: %s", e)
+
+def _deliver_notification(notifiers, title, message, priority):
+    """
+    Deliver a notification through each notifier, isolating their failures.
+
+    Args:
+        notifiers (list): The notifier objects to use.
+        title (str): The title of the notification.
+        message (str): The body of the notification.
+        priority (int): The priority of the notification (if applicable).
+    """
+    for notifier in notifiers:
+        try:
+            notifier.send_notification(title, message, priority)
         except Exception as e:
-            logging.error(f"Error sending Uptime Kuma notification: {e}")
+            logging.error("Failed to send notification using %s: %s", notifier.__class__.__name__, e)
+
+def _coalesce_notifications(items):
+    """
+    Merge notifications sharing notifiers, title and priority into one, in first-queued order.
+
+    Args:
+        items (list): Queued (notifiers, title, message, priority) tuples.
+
+    Returns:
+        list: The merged tuples, with the messages of each group joined by newlines.
+    """
+    merged = {}
+    for notifiers, title, message, priority in items:
+        key = (id(notifiers), title, priority)
+        if key in merged:
+            merged[key][2].append(message)
+        else:
+            merged[key] = (notifiers, title, [message], priority)
+    return [(notifiers, title, "\n".join(messages), priority) for notifiers, title, messages, priority in merged.values()]
+
+def _notification_worker_loop():
+    """Deliver queued notifications in batches until the stop sentinel is received."""
+    while True:
+        batch = [_notification_queue.get()]
+        while True:
+            try:
+                batch.append(_notification_queue.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            # Titles name the container and the kind of change, so a backlog collapses to one message per change kind
+            for item in _coalesce_notifications([item for item in batch if item is not None]):
+                _deliver_notification(*item)
+        finally:
+            for _ in batch:
+                _notification_queue.task_done()
+        if None in batch:
+            return
+
+def _start_notification_worker():
+    """Start the notification delivery thread if it is not running yet."""
+    global _notification_worker
+    with _worker_lock:
+        if _notification_worker is None:
+            _notification_worker = Thread(target=_notification_worker_loop, name="notification-worker", daemon=True)
+            _notification_worker.start()
+            atexit.register(flush_notifications)
+
+def flush_notifications():
+    """Stop the delivery thread once queued notifications are sent, waiting at most FLUSH_TIMEOUT."""
+    if _notification_worker is not None and _notification_worker.is_alive():
+        try:
+            _notification_queue.put(None, timeout=FLUSH_TIMEOUT)
+        except queue.Full:
+            logging.warning("Notification queue still full on exit; pending notifications are discarded.")
+            return
+        _notification_worker.join(FLUSH_TIMEOUT)
 
 # Send notification to all initialized notifiers
 def send_notification(title, message, priority=5):
     """
     Send a notification through all configured notifiers.
 
+    Notifications are queued for a single background thread, so callers never
+    wait on network I/O. Notifications with the same title that are queued up
+    together are delivered as one message, in first-queued order. When the
+    queue is full (e.g. a notifier keeps timing out) the notification is
+    dropped and counted.
+
     Args:
         title (str): The title of the notification.
         message (str): The body of the notification.
         priority (int): The priority of the notification (if applicable).
     """
-    notifiers = initialize_notifiers()
+    global _dropped_notifications
+    notifiers = get_notifiers()
     if notifiers:
-        for notifier in notifiers:
-            try:
-                notifier.send_notification(title, message, priority)
-            except Exception as e:
-                logging.error(f"Failed to send notification using {notifier.__class__.__name__}: {e}")
+        if _notification_worker is None:
+            _start_notification_worker()
+        try:
+            _notification_queue.put_nowait((notifiers, title, message, priority))
+        except queue.Full:
+            _dropped_notifications += 1
+            logging.warning("Notification queue is full, dropping notification '%s' (%d dropped so far).",
+                            title, _dropped_notifications)
     else:
         logging.warning("No notification system configured.")
 
+_notifiers = None
+
+def get_notifiers():
+    """
+    Return the configured notifiers, initializing them on first use.
+
+    Returns:
+        list: A list of instantiated notifier objects.
+    """
+    global _notifiers
+    if _notifiers is None:
+        _notifiers = initialize_notifiers()
+    return _notifiers
+
+def reset_notifiers():
+    """Drop the cached notifiers so they are rebuilt from the current configuration."""
+    global _notifiers
+    _notifiers = None
+
 # Initialize and return the list of configured notifiers
 def initialize_notifiers():
     """
@@ -148,7 +306,7 @@ def initialize_notifiers():
             )
             notifiers.append(email_notifier)
         except Exception as e:
-            logging.error(f"Failed to initialize Email notifier: {e}")
+            logging.error("Failed to initialize Email notifier: %s", e)
 
     # Initialize Gotify notifier if Gotify settings are available
     if DEFAULTS.get('gotify_url') and DEFAULTS.get('gotify_token'):
@@ -156,7 +314,7 @@ def initialize_notifiers():
             gotify_notifier = GotifyNotification(DEFAULTS['gotify_url'], DEFAULTS['gotify_token'])
             notifiers.append(gotify_notifier)
         except Exception as e:
-            logging.error(f"Failed to initialize Gotify notifier: {e}")
+            logging.error("Failed to initialize Gotify notifier: %s", e)
 
     # Initialize Uptime Kuma notifier if webhook URL is available
     if DEFAULTS.get('uptime_kuma_webhook_url'):
@@ -164,6 +322,6 @@ def initialize_notifiers():
             uptime_kuma_notifier = UptimeKumaNotification(DEFAULTS['uptime_kuma_webhook_url'])
             notifiers.append(uptime_kuma_notifier)
         except Exception as e:
-            logging.error(f"Failed to initialize Uptime Kuma notifier: {e}")
+            logging.error("Failed to initialize Uptime Kuma notifier: %s", e)
 
     return notifiers
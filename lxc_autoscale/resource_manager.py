@@ -1,16 +1,70 @@
 import config
 import logging
-from time import sleep
 import lxc_utils
 import scaling_manager
 import notification
-import paramiko
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import as_completed
+from threading import Event
 
-import paramiko
+# Set from the SIGHUP handler, serviced at the start of the next cycle
+_reload_requested = Event()
 
-# Debug print statement to ensure paramiko is imported
-# print(f"Paramiko version: {paramiko.__version__}")
+# Set from the SIGTERM/SIGINT handlers; the loop stops after the current container
+_shutdown_requested = Event()
+
+# Last measured (cpu, mem) per container, used to spot quiescent containers
+_last_usage = {}
+
+# Usage drift (in percentage points) still considered steady between polls
+USAGE_DELTA = 5.0
+
+def is_quiescent(ctid: str, cpu: float, mem: float) -> bool:
+    """
+    Tell whether a container's usage is steady and clear of every scaling threshold.
+
+    Args:
+        ctid (str): The container ID.
+        cpu (float): The CPU usage percentage just measured.
+        mem (float): The memory usage percentage just measured.
+
+    Returns:
+        bool: True if adjusting the container's resources would be a no-op.
+    """
+    previous = _last_usage.get(ctid)
+    _last_usage[ctid] = (cpu, mem)
+    if previous is None or abs(cpu - previous[0]) > USAGE_DELTA or abs(mem - previous[1]) > USAGE_DELTA:
+        return False
+
+    tier = lxc_utils.get_container_config(ctid)
+    return (tier.cpu_lower_threshold + USAGE_DELTA <= cpu <= tier.cpu_upper_threshold - USAGE_DELTA
+            and tier.memory_lower_threshold + USAGE_DELTA <= mem <= tier.memory_upper_threshold - USAGE_DELTA)
+
+def request_shutdown():
+    """Ask the main loop to stop once the decisions made so far have been applied."""
+    _shutdown_requested.set()
+
+def request_reload():
+    """Ask the main loop to reload the configuration before its next cycle."""
+    _reload_requested.set()
+
+def reload_configuration():
+    """
+    Reload the configuration file and drop state derived from the old one.
+
+    The worker pool and container state are kept; only the SSH connection and
+    the notifiers are rebuilt, as their settings may have changed.
+    """
+    logging.info("Reloading configuration from %s...", config.CONFIG_FILE)
+    try:
+        if not config.reload_config():
+            logging.info("Configuration file unchanged, nothing to reload.")
+            return
+    except Exception as e:  # pylint: disable=broad-except
+        logging.error("Failed to reload configuration, keeping the current one: %s", e)
+        return
+    lxc_utils._close_ssh_client()  # pylint: disable=protected-access
+    notification.reset_notifiers()
+    logging.info("Configuration reloaded.")
 
 def collect_data_for_container(ctid: str) -> dict:
     """
@@ -20,85 +74,66 @@ def collect_data_for_container(ctid: str) -> dict:
         ctid (str): The container ID.
 
     Returns:
-        dict: The data collected for the container, or None if the container is not running.
+        dict: The usage data of the container, or None if it could not be collected.
     """
-    if not lxc_utils.is_container_running(ctid):
-        return None
-
-    logging.debug(f"Collecting data for container {ctid}...")
+    logging.debug("Collecting data for container %s...", ctid)
 
     try:
-        # Retrieve the current configuration of the container using Python string operations
-        config_output = lxc_utils.run_command(f"pct config {ctid}")
-        
-        # Initialize values for cores and memory
-        cores = None
-        memory = None
-
-        # Parse the config_output for cores and memory
-        for line in config_output.splitlines():
-            # Check if 'cores' and 'memory' exist and extract their values safely
-            if 'cores' in line:
-                try:
-                    cores_value = line.split()[1]
-                    if cores_value.isdigit():  # Ensure it's a valid integer string
-                        cores = int(cores_value)
-                    else:
-                        logging.warning(f"Invalid value for cores: {cores_value}")
-                except IndexError:
-                    logging.warning(f"Unable to extract cores value from line: {line}")
-            elif 'memory' in line:
-                try:
-                    memory_value = line.split()[1]
-                    if memory_value.isdigit():  # Ensure it's a valid integer string
-                        memory = int(memory_value)
-                    else:
-                        logging.warning(f"Invalid value for memory: {memory_value}")
-                except IndexError:
-                    logging.warning(f"Unable to extract memory value from line: {line}")
-
-        if cores is None or memory is None:
-            raise ValueError(f"Failed to extract valid cores or memory values for container {ctid}")
-
-        settings = {"cores": cores, "memory": memory}
+        # Read cores, memory and usage, batched into one command in remote mode
+        settings, cpu, mem = lxc_utils.get_container_usage(ctid)
+        cores, memory = settings['cores'], settings['memory']
 
         # Backup the current settings
         lxc_utils.backup_container_settings(ctid, settings)
 
-        # Collect CPU and memory usage data
         return {
-            ctid: {
-                "cpu": lxc_utils.get_cpu_usage(ctid),
-                "mem": lxc_utils.get_memory_usage(ctid),
-                "initial_cores": cores,
-                "initial_memory": memory,
-            }
+            "cpu": cpu,
+            "mem": mem,
+            "initial_cores": cores,
+            "initial_memory": memory,
+            # Steady, in-band containers need no vertical adjustment this cycle
+            "dirty": not is_quiescent(ctid, cpu, mem),
         }
     except (ValueError, IndexError) as ve:
-        logging.error(f"Error parsing core or memory values for container {ctid}: {ve}")
+        logging.error("Error parsing core or memory values for container %s: %s", ctid, ve)
         return None
     except Exception as e:
-        logging.error(f"Error retrieving or parsing configuration for container {ctid}: {e}")
+        logging.error("Error retrieving or parsing configuration for container %s: %s", ctid, e)
         return None
 
 
-def collect_container_data() -> dict:
+def get_running_containers() -> list:
+    """
+    List the running LXC containers; a single listing provides both the IDs and their state.
+
+    Returns:
+        list: The IDs of the running, non-ignored containers.
+    """
+    return [ctid for ctid, status in lxc_utils.get_container_statuses().items() if status == 'running']
+
+
+def collect_container_data(running: list = None) -> dict:
     """
     Collect resource usage data for all LXC containers.
 
+    Args:
+        running (list): IDs of the running containers, fetched when not provided.
+
     Returns:
         dict: A dictionary where the keys are container IDs and the values are their respective data.
     """
     containers = {}
-    with ThreadPoolExecutor(max_workers=8) as executor:
-        futures = {executor.submit(collect_data_for_container, ctid): ctid for ctid in lxc_utils.get_containers()}
-        for future in as_completed(futures):
-            try:
-                container_data = future.result()
-                if container_data:
-                    containers.update(container_data)
-            except Exception as e:
-                logging.error(f"Error collecting data for a container: {e}")
+    if running is None:
+        running = get_running_containers()
+    # Probes are pure I/O wait, so fan them out over the shared pool
+    futures = {lxc_utils.EXECUTOR.submit(collect_data_for_container, ctid): ctid for ctid in running}
+    for future in as_completed(futures):
+        try:
+            container_data = future.result()
+            if container_data:
+                containers[futures[future]] = container_data
+        except Exception as e:
+            logging.error("Error collecting data for a container: %s", e)
     return containers
 
 import time
@@ -111,46 +146,67 @@ def main_loop(poll_interval: int, energy_mode: bool):
         poll_interval (int): The interval in seconds between each resource allocation process.
         energy_mode (bool): A flag to indicate if energy efficiency mode should be enabled during off-peak hours.
     """
-    while True:
-        loop_start_time = time.time()
+    next_run = time.monotonic()
+    while not _shutdown_requested.is_set():
+        if _reload_requested.is_set():
+            _reload_requested.clear()
+            reload_configuration()
+
+        loop_start_time = time.monotonic()
+        # Cycles follow a monotonic deadline, so neither the work time nor clock changes make them drift;
+        # after an overrun the schedule restarts from now instead of firing the missed cycles back to back
+        next_run = max(next_run, loop_start_time) + poll_interval
         logging.info("Starting resource allocation process...")
 
         try:
+            # Nothing to probe or scale, skip the rest of the cycle
+            running = get_running_containers()
+            if not running:
+                logging.info("No running containers found. Sleeping until the next run.")
+                _shutdown_requested.wait(max(0.0, next_run - time.monotonic()))
+                continue
+
             # Log time before collecting data
-            collect_start_time = time.time()
+            collect_start_time = time.monotonic()
             logging.debug("Collecting container data...")
-            containers = collect_container_data()
-            collect_duration = time.time() - collect_start_time
-            logging.debug(f"Container data collection took {collect_duration:.2f} seconds.")
+            containers = collect_container_data(running)
+            collect_duration = time.monotonic() - collect_start_time
+            logging.debug("Container data collection took %.2f seconds.", collect_duration)
 
             # Log time before adjusting resources
-            adjust_start_time = time.time()
+            adjust_start_time = time.monotonic()
             logging.debug("Adjusting resources...")
-            scaling_manager.adjust_resources(containers, energy_mode)
-            adjust_duration = time.time() - adjust_start_time
-            logging.debug(f"Resource adjustment took {adjust_duration:.2f} seconds.")
+            scaling_manager.adjust_resources(containers, energy_mode, _shutdown_requested)
+            adjust_duration = time.monotonic() - adjust_start_time
+            logging.debug("Resource adjustment took %.2f seconds.", adjust_duration)
+
+            if _shutdown_requested.is_set():
+                break
 
             # Log time before scaling horizontally
-            scale_start_time = time.time()
+            scale_start_time = time.monotonic()
             logging.debug("Managing horizontal scaling...")
             scaling_manager.manage_horizontal_scaling(containers)
-            scale_duration = time.time() - scale_start_time
-            logging.debug(f"Horizontal scaling took {scale_duration:.2f} seconds.")
+            scale_duration = time.monotonic() - scale_start_time
+            logging.debug("Horizontal scaling took %.2f seconds.", scale_duration)
 
-            loop_duration = time.time() - loop_start_time
-            logging.info(f"Resource allocation process completed. Total loop duration: {loop_duration:.2f} seconds.")
+            loop_duration = time.monotonic() - loop_start_time
+            logging.info("Resource allocation process completed. Total loop duration: %.2f seconds.", loop_duration)
             
-            # Log next run in `poll_interval` seconds
-            if loop_duration < poll_interval:
-                sleep_duration = poll_interval - loop_duration
-                logging.debug(f"Sleeping for {sleep_duration:.2f} seconds until the next run.")
-                sleep(sleep_duration)
+            # Sleep until the deadline of the next run
+            sleep_duration = next_run - time.monotonic()
+            if sleep_duration > 0:
+                logging.debug("Sleeping for %.2f seconds until the next run.", sleep_duration)
+                _shutdown_requested.wait(sleep_duration)
             else:
                 logging.warning("The loop took longer than the poll interval! No sleep will occur.")
 
         except Exception as e:
-            logging.error(f"Error in main loop: {e}")
+            logging.error("Error in main loop: %s", e)
             logging.exception("Exception traceback:")
             # Optional: Decide if you want to continue or handle specific exceptions differently.
-            sleep(poll_interval)  # Optional: Handle the error more gracefully or exit
+            _shutdown_requested.wait(max(0.0, next_run - time.monotonic()))  # Optional: Handle the error more gracefully or exit
 
+    # Let in-flight probes and `pct set` calls finish before the lock is released
+    logging.info("Shutdown requested. Waiting for pending work to finish...")
+    lxc_utils.EXECUTOR.shutdown(wait=True)
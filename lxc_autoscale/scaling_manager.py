@@ -1,25 +1,30 @@
-from config import config
 import logging  # For logging events and errors
 from datetime import datetime, timedelta  # For handling dates and times
+import time  # For the current local hour
 from lxc_utils import (  # Import necessary utility functions related to LXC management
-    run_command, get_containers, is_container_running, backup_container_settings,
-    load_backup_settings, rollback_container_settings, log_json_event, get_total_cores,
-    get_total_memory, get_cpu_usage, get_memory_usage, is_ignored, get_container_data,
-    collect_container_data, prioritize_containers, get_container_config,
-    generate_unique_snapshot_name, generate_cloned_hostname
+    EXECUTOR, run_command, apply_container_settings, log_json_event,
+    get_total_cores, get_total_memory, get_container_config
 )
 from notification import send_notification  # Import the notification function
-from config import HORIZONTAL_SCALING_GROUPS, IGNORE_LXC, DEFAULTS  # Import configuration constants
-import paramiko
+from config import HORIZONTAL_SCALING_GROUPS, IGNORE_LXC, SETTINGS  # Import configuration constants
 
 # Constants for repeated values
 TIMEOUT_EXTENDED = 300  # Extended timeout for scaling operations
 CPU_SCALE_DIVISOR = 10  # Divisor for dynamic CPU scaling
 MEMORY_SCALE_FACTOR = 10  # Factor for dynamic memory scaling
 
+# Step multipliers for each scaling behaviour; anything else scales like 'normal'
+BEHAVIOUR_MULTIPLIERS = {'conservative': 0.5, 'normal': 1.0, 'aggressive': 2.0}
+
 # Dictionary to track the last scale-out action for each group
 scale_last_action = {}
 
+# Containers already reduced to their minimums in the current off-peak window
+_offpeak_reduced = set()
+
+# Direction ('up' or 'down') of the last CPU adjustment per container, for hysteresis
+_last_cpu_action = {}
+
 def generate_unique_snapshot_name(base_name):
     """
     Generate a unique name for a snapshot using the current timestamp.
@@ -79,20 +84,7 @@ def calculate_decrement(current, lower_threshold, current_allocated, min_decreme
     dynamic_decrement = max(1, int((lower_threshold - current) / CPU_SCALE_DIVISOR))
     return max(min(current_allocated - min_allocated, dynamic_decrement), min_decrement)
 
-def get_behaviour_multiplier():
-    """
-    Determine the behavior multiplier based on the current configuration.
-
-    Returns:
-        float: The behavior multiplier (1.0 for normal, 0.5 for conservative, 2.0 for aggressive).
-    """
-    if DEFAULTS['behaviour'] == 'conservative':
-        return 0.5
-    elif DEFAULTS['behaviour'] == 'aggressive':
-        return 2.0
-    return 1.0
-
-def scale_memory(ctid, mem_usage, mem_upper, mem_lower, current_memory, min_memory, available_memory, config):
+def scale_memory(ctid, mem_usage, mem_upper, mem_lower, current_memory, min_memory, available_memory, tier, pending):
     """
     Adjust memory for a container based on current usage.
 
@@ -104,39 +96,42 @@ def scale_memory(ctid, mem_usage, mem_upper, mem_lower, current_memory, min_memo
         current_memory (int): Currently allocated memory.
         min_memory (int): Minimum memory allowed.
         available_memory (int): Available memory.
-        config (dict): Configuration dictionary.
+        tier (TierConfig): Tier configuration of the container.
+        pending (dict): Pending `pct set` options for the container, updated in place.
 
     Returns:
         tuple: Updated available memory and flag indicating if memory was changed.
     """
     memory_changed = False
-    behaviour_multiplier = get_behaviour_multiplier()
+    multiplier = BEHAVIOUR_MULTIPLIERS.get(SETTINGS.behaviour, 1.0)
+    memory_increment = int(tier.memory_min_increment * multiplier)
+    decrease_chunk = int(tier.min_decrease_chunk * multiplier)
 
     if mem_usage > mem_upper:
         increment = max(
-            int(config['memory_min_increment'] * behaviour_multiplier),
-            int((mem_usage - mem_upper) * config['memory_min_increment'] / MEMORY_SCALE_FACTOR)
+            memory_increment,
+            int((mem_usage - mem_upper) * tier.memory_min_increment / MEMORY_SCALE_FACTOR)
         )
         if available_memory >= increment:
-            logging.info(f"Increasing memory for container {ctid} by {increment}MB...")
+            logging.info("Increasing memory for container %s by %sMB...", ctid, increment)
             new_memory = current_memory + increment
-            run_command(f"pct set {ctid} -memory {new_memory}")
+            pending['memory'] = new_memory
             available_memory -= increment
             memory_changed = True
             log_json_event(ctid, "Increase Memory", f"{increment}MB")
             send_notification(f"Memory Increased for Container {ctid}", f"Memory increased by {increment}MB.")
         else:
-            logging.warning(f"Not enough available memory to increase for container {ctid}")
+            logging.warning("Not enough available memory to increase for container %s", ctid)
 
     elif mem_usage < mem_lower and current_memory > min_memory:
         decrease_amount = calculate_decrement(
             mem_usage, mem_lower, current_memory,
-            int(config['min_decrease_chunk'] * behaviour_multiplier), min_memory
+            decrease_chunk, min_memory
         )
         if decrease_amount > 0:
-            logging.info(f"Decreasing memory for container {ctid} by {decrease_amount}MB...")
+            logging.info("Decreasing memory for container %s by %sMB...", ctid, decrease_amount)
             new_memory = current_memory - decrease_amount
-            run_command(f"pct set {ctid} -memory {new_memory}")
+            pending['memory'] = new_memory
             available_memory += decrease_amount
             memory_changed = True
             log_json_event(ctid, "Decrease Memory", f"{decrease_amount}MB")
@@ -144,128 +139,206 @@ def scale_memory(ctid, mem_usage, mem_upper, mem_lower, current_memory, min_memo
 
     return available_memory, memory_changed
 
-def adjust_resources(containers, energy_mode):
+def cpu_scaling_thresholds(ctid, tier):
+    """
+    Return the CPU usage above which a container scales up and below which it scales down.
+
+    Right after scaling one way, the reverse direction only triggers once usage
+    clears the tier's recovery threshold.
+
+    Args:
+        ctid (str): Container ID.
+        tier (TierConfig): Tier configuration of the container.
+
+    Returns:
+        tuple: The scale-up and scale-down CPU usage percentages.
+    """
+    last_cpu_action = _last_cpu_action.get(ctid)
+    scale_up_at = tier.cpu_upper_recovery if last_cpu_action == 'down' else tier.cpu_upper_threshold
+    scale_down_at = tier.cpu_lower_recovery if last_cpu_action == 'up' else tier.cpu_lower_threshold
+    return scale_up_at, scale_down_at
+
+def scaling_order(item):
+    """
+    Sort key deciding the order in which containers draw on the host budget.
+
+    Containers that will not grow come first, so whatever they release is
+    available to the others; growing containers follow, busiest first. The
+    outcome therefore does not depend on the order containers are listed in.
+
+    Args:
+        item (tuple): A (ctid, usage) pair of the collected container data.
+
+    Returns:
+        tuple: The sort key.
+    """
+    ctid, usage = item
+    tier = get_container_config(ctid)
+    grows = usage['cpu'] > cpu_scaling_thresholds(ctid, tier)[0] or usage['mem'] > tier.memory_upper_threshold
+    return grows, -usage['cpu'], -usage['mem']
+
+def adjust_resources(containers, energy_mode, stop_event=None):
     """
     Adjust CPU and memory resources for each container based on usage.
 
     Args:
         containers (dict): A dictionary of container resource usage data.
         energy_mode (bool): Flag to indicate if energy-saving adjustments should be made during off-peak hours.
+        stop_event (threading.Event): When set, no further containers are evaluated; decisions
+            already made are still applied.
     """
     logging.info("Starting resource allocation process...")
-    logging.info(f"Ignoring LXC Containers: {IGNORE_LXC}")
-
-    total_cores = get_total_cores()
-    total_memory = get_total_memory()
+    logging.info("Ignoring LXC Containers: %s", IGNORE_LXC)
 
-    reserved_cores = max(1, int(total_cores * DEFAULTS['reserve_cpu_percent'] / 100))
-    reserved_memory = DEFAULTS['reserve_memory_mb']
+    # Evaluate the off-peak window once per cycle; leaving it re-arms the reduction
+    off_peak = energy_mode and is_off_peak()
+    if not off_peak:
+        _offpeak_reduced.clear()
 
-    available_cores = total_cores - reserved_cores
-    available_memory = total_memory - reserved_memory
+    # In steady state no container needs work, so skip the host queries and the summary
+    if not any(usage.get('dirty', True) or (off_peak and ctid not in _offpeak_reduced)
+               for ctid, usage in containers.items() if ctid not in IGNORE_LXC):
+        logging.info("All containers are steady within thresholds. No adjustments needed.")
+        return
 
-    logging.info(f"Initial resources before adjustments: {available_cores} cores, {available_memory} MB memory")
+    # Both helpers already subtract the configured reserves
+    available_cores = get_total_cores()
+    available_memory = get_total_memory()
 
-    # Build a mapping of container IDs to their tier configurations
-    container_tiers = {}
-    for key, value in DEFAULTS.items():
-        if key.startswith("TIER_") and "lxc_containers" in value:
-            for ctid in value["lxc_containers"]:
-                container_tiers[str(ctid)] = value
+    logging.info("Initial resources before adjustments: %s cores, %s MB memory", available_cores, available_memory)
 
     # Print current resource usage for all running LXC containers
-    logging.info("Current resource usage for all containers:")
-    for ctid, usage in containers.items():
-        rounded_cpu_usage = round(usage['cpu'], 2)
-        rounded_mem_usage = round(usage['mem'], 2)
-        total_mem_allocated = usage['initial_memory']
-        free_mem_percent = round(100 - ((rounded_mem_usage / total_mem_allocated) * 100), 2)
-
-        logging.info(f"Container {ctid}: CPU usage: {rounded_cpu_usage}%, Memory usage: {rounded_mem_usage}MB "
-                     f"({free_mem_percent}% free of {total_mem_allocated}MB total), "
-                     f"Initial cores: {usage['initial_cores']}, Initial memory: {total_mem_allocated}MB")
+    # Skip the per-container summary entirely when INFO is filtered out
+    if logging.getLogger().isEnabledFor(logging.INFO):
+        logging.info("Current resource usage for all containers:")
+        for ctid, usage in containers.items():
+            total_mem_allocated = usage['initial_memory']
+            free_mem_percent = 100 - ((usage['mem'] / total_mem_allocated) * 100)
+
+            logging.info("Container %s: CPU usage: %.2f%%, Memory usage: %.2fMB "
+                         "(%.2f%% free of %sMB total), "
+                         "Initial cores: %s, Initial memory: %sMB",
+                         ctid, usage['cpu'], usage['mem'], free_mem_percent, total_mem_allocated,
+                         usage['initial_cores'], total_mem_allocated)
+
+    # Decisions are staged here and applied together once every container is evaluated
+    decisions = []
 
     # Proceed with the rest of the logic for adjusting resources
-    for ctid, usage in containers.items():
+    for ctid, usage in sorted(containers.items(), key=scaling_order):
+        if stop_event is not None and stop_event.is_set():
+            logging.info("Shutdown requested. Skipping the remaining containers.")
+            break
+
         if ctid in IGNORE_LXC:
-            logging.info(f"Container {ctid} is ignored. Skipping resource adjustment.")
+            logging.info("Container %s is ignored. Skipping resource adjustment.", ctid)
+            continue
+
+        # Nothing to do for a steady, in-band container unless it is due its off-peak reduction
+        if not usage.get('dirty', True) and not (off_peak and ctid not in _offpeak_reduced):
+            logging.debug("Container %s usage is steady within thresholds. Skipping resource adjustment.", ctid)
             continue
 
         # Retrieve the tier configuration or default
-        config = container_tiers.get(str(ctid), DEFAULTS)
-        cpu_upper = config['cpu_upper_threshold']
-        cpu_lower = config['cpu_lower_threshold']
-        mem_upper = config['memory_upper_threshold']
-        mem_lower = config['memory_lower_threshold']
-        min_cores = config['min_cores']
-        max_cores = config['max_cores']
-        min_memory = config['min_memory']
+        tier = get_container_config(ctid)
+        cpu_upper = tier.cpu_upper_threshold
+        cpu_lower = tier.cpu_lower_threshold
+        mem_upper = tier.memory_upper_threshold
+        mem_lower = tier.memory_lower_threshold
+        min_cores = tier.min_cores
+        max_cores = tier.max_cores
+        min_memory = tier.min_memory
 
         cpu_usage = usage['cpu']
         mem_usage = usage['mem']
 
+        scale_up_at, scale_down_at = cpu_scaling_thresholds(ctid, tier)
+
+        # Usage inside both bands triggers none of the branches below, unless an off-peak reduction is due
+        if (scale_down_at <= cpu_usage <= scale_up_at and mem_lower <= mem_usage <= mem_upper
+                and not (off_peak and ctid not in _offpeak_reduced)):
+            logging.debug("Container %s usage is within thresholds. Skipping resource adjustment.", ctid)
+            continue
+
         current_cores = usage["initial_cores"]
         current_memory = usage["initial_memory"]
 
         cores_changed = False
         memory_changed = False
-
-        behaviour_multiplier = get_behaviour_multiplier()
+        # Options for a single `pct set` call issued once all decisions are made
+        pending = {}
 
         # Adjust CPU cores if needed
-        if cpu_usage > cpu_upper:
-            increment = calculate_increment(cpu_usage, cpu_upper, config['core_min_increment'], config['core_max_increment'])
+        if cpu_usage > scale_up_at:
+            increment = calculate_increment(cpu_usage, cpu_upper, tier.core_min_increment, tier.core_max_increment)
             new_cores = current_cores + increment
 
-            logging.info(f"Container {ctid} - CPU usage exceeds upper threshold.")
-            logging.info(f"Container {ctid} - Increment: {increment}, New cores: {new_cores}")
+            logging.info("Container %s - CPU usage exceeds upper threshold.", ctid)
+            logging.info("Container %s - Increment: %s, New cores: %s", ctid, increment, new_cores)
 
             if available_cores >= increment and new_cores <= max_cores:
-                run_command(f"pct set {ctid} -cores {new_cores}")
+                pending['cores'] = new_cores
                 available_cores -= increment
                 cores_changed = True
+                _last_cpu_action[ctid] = 'up'
                 log_json_event(ctid, "Increase Cores", f"{increment}")
                 send_notification(f"CPU Increased for Container {ctid}", f"CPU cores increased to {new_cores}.")
             else:
-                logging.warning(f"Container {ctid} - Not enough available cores to increase.")
+                logging.warning("Container %s - Not enough available cores to increase.", ctid)
 
-        elif cpu_usage < cpu_lower and current_cores > min_cores:
-            decrement = calculate_decrement(cpu_usage, cpu_lower, current_cores, config['core_min_increment'], min_cores)
+        elif cpu_usage < scale_down_at and current_cores > min_cores:
+            decrement = calculate_decrement(cpu_usage, cpu_lower, current_cores, tier.core_min_increment, min_cores)
             new_cores = max(min_cores, current_cores - decrement)
 
-            logging.info(f"Container {ctid} - CPU usage below lower threshold.")
-            logging.info(f"Container {ctid} - Decrement: {decrement}, New cores: {new_cores}")
+            logging.info("Container %s - CPU usage below lower threshold.", ctid)
+            logging.info("Container %s - Decrement: %s, New cores: %s", ctid, decrement, new_cores)
 
             if new_cores >= min_cores:
-                run_command(f"pct set {ctid} -cores {new_cores}")
+                pending['cores'] = new_cores
                 available_cores += (current_cores - new_cores)
                 cores_changed = True
+                _last_cpu_action[ctid] = 'down'
                 log_json_event(ctid, "Decrease Cores", f"{decrement}")
                 send_notification(f"CPU Decreased for Container {ctid}", f"CPU cores decreased to {new_cores}.")
             else:
-                logging.warning(f"Container {ctid} - Cannot decrease cores below min_cores.")
+                logging.warning("Container %s - Cannot decrease cores below min_cores.", ctid)
 
         # Adjust memory if needed
         available_memory, memory_changed = scale_memory(
-            ctid, mem_usage, mem_upper, mem_lower, current_memory, min_memory, available_memory, config
+            ctid, mem_usage, mem_upper, mem_lower, current_memory, min_memory, available_memory, tier, pending
         )
 
-        # Apply energy efficiency mode if enabled
-        if energy_mode and is_off_peak():
+        # Apply energy efficiency mode once per container per off-peak window
+        if off_peak and ctid not in _offpeak_reduced:
+            _offpeak_reduced.add(ctid)
             if current_cores > min_cores:
-                logging.info(f"Reducing cores for energy efficiency during off-peak hours for container {ctid}...")
-                run_command(f"pct set {ctid} -cores {min_cores}")
+                logging.info("Reducing cores for energy efficiency during off-peak hours for container %s...", ctid)
+                pending['cores'] = min_cores
                 available_cores += (current_cores - min_cores)
                 log_json_event(ctid, "Reduce Cores (Off-Peak)", f"{current_cores - min_cores}")
                 send_notification(f"CPU Reduced for Container {ctid}", f"CPU cores reduced to {min_cores} for energy efficiency.")
             if current_memory > min_memory:
-                logging.info(f"Reducing memory for energy efficiency during off-peak hours for container {ctid}...")
-                run_command(f"pct set {ctid} -memory {min_memory}")
+                logging.info("Reducing memory for energy efficiency during off-peak hours for container %s...", ctid)
+                pending['memory'] = min_memory
                 available_memory += (current_memory - min_memory)
                 log_json_event(ctid, "Reduce Memory (Off-Peak)", f"{current_memory - min_memory}MB")
                 send_notification(f"Memory Reduced for Container {ctid}", f"Memory reduced to {min_memory}MB for energy efficiency.")
 
-    logging.info(f"Final resources after adjustments: {available_cores} cores, {available_memory} MB memory")
+        # A no-op `pct set` still locks and rewrites the container config, so drop unchanged values
+        if pending.get('cores') == current_cores:
+            del pending['cores']
+        if pending.get('memory') == current_memory:
+            del pending['memory']
+
+        # Stage all changes for this container as one `pct set` invocation
+        if pending:
+            decisions.append((ctid, pending))
+
+    # The budget was settled above, so the `pct set` calls can run concurrently
+    for _ in EXECUTOR.map(lambda decision: apply_container_settings(*decision), decisions):
+        pass
+
+    logging.info("Final resources after adjustments: %s cores, %s MB memory", available_cores, available_memory)
 
 
 def manage_horizontal_scaling(containers):
@@ -291,18 +364,18 @@ def manage_horizontal_scaling(containers):
             avg_cpu_usage = 0
             avg_mem_usage = 0
 
-        logging.debug(f"Group: {group_name} | Average CPU Usage: {avg_cpu_usage}% | Average Memory Usage: {avg_mem_usage}%")
+        logging.debug("Group: %s | Average CPU Usage: %s%% | Average Memory Usage: %s%%", group_name, avg_cpu_usage, avg_mem_usage)
 
         # Check if scaling out is needed based on usage thresholds
         if (avg_cpu_usage > group_config['horiz_cpu_upper_threshold'] or
             avg_mem_usage > group_config['horiz_memory_upper_threshold']):
-            logging.debug(f"Thresholds exceeded for {group_name}. Evaluating scale-out conditions.")
+            logging.debug("Thresholds exceeded for %s. Evaluating scale-out conditions.", group_name)
 
             # Ensure enough time has passed since the last scaling action
             if current_time - last_action_time >= timedelta(seconds=group_config.get('scale_out_grace_period', 300)):
                 scale_out(group_name, group_config)
         else:
-            logging.debug(f"No scaling needed for {group_name}. Average usage below thresholds.")
+            logging.debug("No scaling needed for %s. Average usage below thresholds.", group_name)
 
 def scale_out(group_name, group_config):
     """
@@ -318,7 +391,7 @@ def scale_out(group_name, group_config):
 
     # Check if the maximum number of instances has been reached
     if len(current_instances) >= max_instances:
-        logging.info(f"Max instances reached for {group_name}. No scale out performed.")
+        logging.info("Max instances reached for %s. No scale out performed.", group_name)
         return
 
     # Determine the next available clone ID
@@ -328,49 +401,49 @@ def scale_out(group_name, group_config):
     # Create a unique snapshot name
     unique_snapshot_name = generate_unique_snapshot_name("snap")
 
-    logging.info(f"Creating snapshot {unique_snapshot_name} of container {base_snapshot}...")
+    logging.info("Creating snapshot %s of container %s...", unique_snapshot_name, base_snapshot)
 
     # Create the snapshot
-    snapshot_cmd = f"pct snapshot {base_snapshot} {unique_snapshot_name} --description 'Auto snapshot for scaling'"
+    snapshot_cmd = ["pct", "snapshot", str(base_snapshot), unique_snapshot_name, "--description", "Auto snapshot for scaling"]
     if run_command(snapshot_cmd):
-        logging.info(f"Snapshot {unique_snapshot_name} created successfully.")
+        logging.info("Snapshot %s created successfully.", unique_snapshot_name)
 
-        logging.info(f"Cloning container {base_snapshot} to create {new_ctid} using snapshot {unique_snapshot_name}...")
+        logging.info("Cloning container %s to create %s using snapshot %s...", base_snapshot, new_ctid, unique_snapshot_name)
 
         # Clone the container using the snapshot, with an extended timeout
         clone_hostname = generate_cloned_hostname(base_snapshot, len(current_instances) + 1)
-        clone_cmd = f"pct clone {base_snapshot} {new_ctid} --snapname {unique_snapshot_name} --hostname {clone_hostname}"
+        clone_cmd = ["pct", "clone", str(base_snapshot), str(new_ctid), "--snapname", unique_snapshot_name, "--hostname", clone_hostname]
         if run_command(clone_cmd, timeout=TIMEOUT_EXTENDED):  # Extended timeout to 300 seconds
             # Network setup based on group configuration
             if group_config['clone_network_type'] == "dhcp":
-                run_command(f"pct set {new_ctid} -net0 name=eth0,bridge=vmbr0,ip=dhcp")
+                run_command(["pct", "set", str(new_ctid), "-net0", "name=eth0,bridge=vmbr0,ip=dhcp"])
             elif group_config['clone_network_type'] == "static":
                 static_ip_range = group_config.get('static_ip_range', [])
                 if static_ip_range:
                     available_ips = [ip for ip in static_ip_range if ip not in current_instances]
                     if available_ips:
                         ip_address = available_ips[0]
-                        run_command(f"pct set {new_ctid} -net0 name=eth0,bridge=vmbr0,ip={ip_address}/24")
+                        run_command(["pct", "set", str(new_ctid), "-net0", f"name=eth0,bridge=vmbr0,ip={ip_address}/24"])
                     else:
                         logging.warning("No available IPs in the specified range for static IP assignment.")
 
             # Start the new container
-            run_command(f"pct start {new_ctid}")
+            run_command(["pct", "start", str(new_ctid)])
             current_instances.append(new_ctid)
 
             # Update the configuration and tracking
             group_config['lxc_containers'] = set(map(str, current_instances))
             scale_last_action[group_name] = datetime.now()
 
-            logging.info(f"Container {new_ctid} started successfully as part of {group_name}.")
+            logging.info("Container %s started successfully as part of %s.", new_ctid, group_name)
             send_notification(f"Scale Out: {group_name}", f"New container {new_ctid} with hostname {clone_hostname} started.")
 
             # Log the scale-out event to JSON
             log_json_event(new_ctid, "Scale Out", f"Container {base_snapshot} cloned to {new_ctid}. {new_ctid} started.")
         else:
-            logging.error(f"Failed to clone container {base_snapshot} using snapshot {unique_snapshot_name}.")
+            logging.error("Failed to clone container %s using snapshot %s.", base_snapshot, unique_snapshot_name)
     else:
-        logging.error(f"Failed to create snapshot {unique_snapshot_name} of container {base_snapshot}.")
+        logging.error("Failed to create snapshot %s of container %s.", unique_snapshot_name, base_snapshot)
 
 def is_off_peak():
     """
@@ -379,5 +452,5 @@ def is_off_peak():
     Returns:
         bool: True if it is off-peak, otherwise False.
     """
-    current_hour = datetime.now().hour
-    return DEFAULTS['off_peak_start'] <= current_hour or current_hour < DEFAULTS['off_peak_end']
+    current_hour = time.localtime().tm_hour
+    return SETTINGS.off_peak_start <= current_hour or current_hour < SETTINGS.off_peak_end
@@ -17,6 +17,7 @@ readonly INSTALL_DIRS=(
 )
 readonly LOG_FILES=(
     "/var/log/lxc_autoscale.log"
+    "/var/log/lxc_autoscale.log".{1..5}
     "/var/log/lxc_autoscale.json"
 )
 